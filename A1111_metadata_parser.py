@@ -1,4 +1,112 @@
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .image_header_reader import 读取图像头部元数据, 提取嵌入参数
+except ImportError:
+    from image_header_reader import 读取图像头部元数据, 提取嵌入参数
+
+# A1111 参数行中的 "键: 值" 对，值可以是带转义的双引号字符串（与 A1111 的 re_param 相同）
+_参数对正则 = re.compile(r'\s*(\w[\w \-/]+):\s*("(?:\\.|[^\\"])+"|[^,]*)(?:,|$)')
+# "name: hash, name2: hash2" 形式的 Lora hashes / TI hashes
+_哈希对正则 = re.compile(r'\s*([^:,]+?)\s*:\s*([^,]*)(?:,|$)')
+# ADetailer 第 2 个及以后的检测器写作 "ADetailer model 2nd" 等
+_ADetailer序号正则 = re.compile(r'^ADetailer (.+?)(?: (\d+)(?:st|nd|rd|th))?$')
+_数值正则 = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+def _取数值(值: str, 类型, 默认值):
+    匹配 = _数值正则.search(值 or "")
+    if 匹配 is None:
+        return 默认值
+    try:
+        return 类型(匹配.group()) if 类型 is float else int(float(匹配.group()))
+    except ValueError:
+        return 默认值
+
+def _解析哈希列表(值: str) -> dict:
+    return {名称: 哈希.strip() for 名称, 哈希 in _哈希对正则.findall(值 or "") if 名称}
+
+def parse_a1111_parameters(parameters: str) -> dict:
+    """
+    一次线性扫描 A1111/Forge 的 parameters 文本，返回：
+    - positive / negative: 正面、负面提示词
+    - settings: 最后一行 "Steps: ..." 中的 {键: 值}（保留原始键名和顺序，引号值已去掉引号）
+    - steps, sampler, schedule_type, cfg_scale, seed, width, height, model, model_hash: 常用字段（缺失时为 0 / -1 / ""）
+    - lora_hashes, ti_hashes: {名称: 哈希}
+    - hires: Hires 开头的字段及 Denoising strength
+    - adetailer: 每个 ADetailer 检测器一个字典（去掉 "ADetailer " 前缀和序号后缀），按序号排列
+    """
+    # 逐行扫描一次：记录 "Negative prompt: " 开始的位置和最后一个 "Steps: " 行的位置，最后统一切片
+    negative_start = steps_start = -1
+    pos = 0
+    while pos <= len(parameters):
+        if negative_start == -1 and parameters.startswith("Negative prompt: ", pos):
+            negative_start = pos
+        elif parameters.startswith("Steps: ", pos):
+            steps_start = pos
+        next_newline = parameters.find("\n", pos)
+        if next_newline == -1:
+            break
+        pos = next_newline + 1
+
+    prompt_end = steps_start if steps_start != -1 else len(parameters)
+    if negative_start != -1 and negative_start < prompt_end:
+        positive = parameters[:negative_start]
+        negative = parameters[negative_start + len("Negative prompt: "):prompt_end]
+    else:
+        positive, negative = parameters[:prompt_end], ""
+    settings_line = parameters[steps_start:] if steps_start != -1 else ""
+
+    settings = {}
+    for key, value in _参数对正则.findall(settings_line):
+        if value[:1] == '"' and value[-1:] == '"':
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                value = value[1:-1]
+        settings[key.strip()] = value.strip()
+
+    宽度, _, 高度 = settings.get("Size", "").partition("x")
+    hires = {}
+    adetailer = {}
+    for key, value in settings.items():
+        if key.startswith("Hires") or key == "Denoising strength":
+            hires[key] = value
+        elif key.startswith("ADetailer "):
+            匹配 = _ADetailer序号正则.match(key)
+            序号 = int(匹配.group(2)) if 匹配.group(2) else 1
+            adetailer.setdefault(序号, {})[匹配.group(1)] = value
+
+    return {
+        "positive": positive.rstrip("\n"),
+        "negative": negative.rstrip("\n"),
+        "settings": settings,
+        "steps": _取数值(settings.get("Steps"), int, 0),
+        "sampler": settings.get("Sampler", ""),
+        "schedule_type": settings.get("Schedule type", ""),
+        "cfg_scale": _取数值(settings.get("CFG scale"), float, 0.0),
+        "seed": _取数值(settings.get("Seed"), int, -1),
+        "width": _取数值(宽度, int, 0),
+        "height": _取数值(高度, int, 0),
+        "model": settings.get("Model", ""),
+        "model_hash": settings.get("Model hash", ""),
+        "lora_hashes": _解析哈希列表(settings.get("Lora hashes")),
+        "ti_hashes": _解析哈希列表(settings.get("TI hashes")),
+        "hires": hires,
+        "adetailer": [adetailer[序号] for 序号 in sorted(adetailer)],
+    }
+
+def _取出parameters(metadata: str) -> str:
+    """输入可以是加载节点输出的 JSON（取其中的 parameters），也可以直接是 parameters 文本。"""
+    try:
+        data = json.loads(metadata)
+    except (json.JSONDecodeError, TypeError):
+        return metadata or ""
+    if isinstance(data, dict):
+        parameters = data.get('parameters') or ''
+        return parameters if isinstance(parameters, str) else json.dumps(parameters, ensure_ascii=False)
+    return ""
 
 class A1111MetadataParserPrompts:
     """
@@ -71,13 +179,105 @@ class A1111MetadataParserPrompts:
         # 4. 返回所有三个值
         return (final_positive, final_negative, status_code)
 
+class A1111MetadataParserFields:
+    """
+    一次扫描 A1111/Forge 的 parameters，输出全部常用生成参数。
+    - 输入可以是加载节点输出的元数据 JSON，也可以直接是 parameters 文本。
+    - 缺失的数值字段输出 0（种子为 -1），文本字段输出空字符串。
+    - LoRA 哈希、Hires、ADetailer 以及全部字段以 JSON 字符串输出。
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "metadata_json": ("STRING", {"forceInput": True}),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT", "STRING", "STRING", "FLOAT", "INT", "INT", "INT",
+                    "STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("正面提示词", "负面提示词", "Steps", "Sampler", "Schedule type", "CFG scale", "Seed", "宽度", "高度",
+                    "Model", "Model hash", "LoRA hashes (JSON)", "Hires (JSON)", "ADetailer (JSON)", "全部字段 (JSON)")
+
+    FUNCTION = "extract_fields"
+    CATEGORY = "自动数据"
+
+    def extract_fields(self, metadata_json: str):
+        fields = parse_a1111_parameters(_取出parameters(metadata_json))
+        return (
+            fields["positive"].strip(), fields["negative"].strip(),
+            fields["steps"], fields["sampler"], fields["schedule_type"], fields["cfg_scale"], fields["seed"],
+            fields["width"], fields["height"], fields["model"], fields["model_hash"],
+            json.dumps(fields["lora_hashes"], ensure_ascii=False),
+            json.dumps(fields["hires"], ensure_ascii=False),
+            json.dumps(fields["adetailer"], ensure_ascii=False),
+            json.dumps(fields, ensure_ascii=False),
+        )
+
+class A1111MetadataParserFromFiles:
+    """
+    直接从图像文件提取提示词：只读取文件头部的 parameters 文本块（PNG tEXt/iTXt、JPEG/WebP EXIF），
+    不解码像素，也不经过加载节点的 JSON 序列化和本节点的反序列化。
+    - 输入一个或多个完整路径（每行一个，可直接连接加载节点的 完整路径 / 完整路径列表 输出）。
+    - 每个输出都是列表，与输入路径一一对应；负面提示词和状态码的规则与 A1111元数据提取提示词 相同。
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image_paths": ("STRING", {"multiline": True, "default": ""}),
+            },
+            "optional": {
+                "default_negative": ("STRING", {"multiline": False, "default": "", "placeholder": "默认负面提示词..."}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT", "STRING")
+    RETURN_NAMES = ("正面提示词", "负面提示词", "状态 (Status)", "全部字段 (JSON)")
+    OUTPUT_IS_LIST = (True, True, True, True)
+
+    FUNCTION = "extract_from_files"
+    CATEGORY = "自动数据"
+
+    @staticmethod
+    def _读取parameters(path: str) -> str:
+        try:
+            return 提取嵌入参数(读取图像头部元数据(path)["文本"])
+        except Exception as e:
+            print(f"[A1111MetadataParserFromFiles] 警告: 读取 '{path}' 的元数据失败: {e}")
+            return ""
+
+    def extract_from_files(self, image_paths: str, default_negative: str = ""):
+        paths = [line.strip() for line in image_paths.splitlines() if line.strip()]
+        # 头部只有几 KB，瓶颈在打开文件的延迟（网络盘尤其明显），多个路径时并行读取
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(paths)))) as pool:
+            all_parameters = list(pool.map(self._读取parameters, paths))
+
+        positives, negatives, statuses, fields_json = [], [], [], []
+        for parameters in all_parameters:
+            fields = parse_a1111_parameters(parameters) if not parameters.lstrip().startswith('{') else None
+            positive = fields["positive"].strip() if fields else ""
+            negative = fields["negative"].strip() if fields else ""
+            positives.append(positive)
+            # 与 A1111MetadataParserPrompts 相同：清理后长度不足 10 的负面提示词视为无效
+            negatives.append(negative if len(negative) >= 10 else default_negative)
+            statuses.append(1 if positive else 2)
+            fields_json.append(json.dumps(fields or {}, ensure_ascii=False))
+        return (positives, negatives, statuses, fields_json)
+
 # ---------------------------------------------------------------------------------
-# ComfyUI 节点注册部分 (保持不变)
+# ComfyUI 节点注册部分
 # ---------------------------------------------------------------------------------
 NODE_CLASS_MAPPINGS = {
-    "A1111MetadataParserPrompts": A1111MetadataParserPrompts
+    "A1111MetadataParserPrompts": A1111MetadataParserPrompts,
+    "A1111MetadataParserFields": A1111MetadataParserFields,
+    "A1111MetadataParserFromFiles": A1111MetadataParserFromFiles
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "A1111MetadataParserPrompts": "A1111元数据提取提示词"
+    "A1111MetadataParserPrompts": "A1111元数据提取提示词",
+    "A1111MetadataParserFields": "A1111元数据提取全部字段",
+    "A1111MetadataParserFromFiles": "A1111从图像文件提取提示词"
 }
\ No newline at end of file
@@ -0,0 +1,73 @@
+# ComfyUI-AutoData-for-lora/benchmarks/bench_image_to_tensor.py
+"""
+对比图像加载节点旧/新两种 uint8 -> float32 转换方式的峰值内存 (RSS)。
+每种方式在独立子进程中运行，避免互相影响。需要在装有 torch/numpy/Pillow 的 ComfyUI Python 环境中执行：
+
+    python benchmarks/bench_image_to_tensor.py [--宽 3840 --高 2160 --灰度]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+仓库目录 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _峰值内存MB() -> float:
+    try:
+        import psutil  # ComfyUI 自带依赖；Windows 上只能通过它读取峰值工作集
+        内存信息 = psutil.Process().memory_info()
+        return getattr(内存信息, "peak_wset", 内存信息.rss) / (1024 * 1024)
+    except ImportError:
+        import resource
+        峰值 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return 峰值 / (1024 * 1024) if sys.platform == "darwin" else 峰值 / 1024
+
+def _运行单项(方式: str, 宽: int, 高: int, 灰度: bool) -> None:
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    sys.path.insert(0, 仓库目录)
+    from get_marked_image_by_index import 按序号加载标记图像_V5
+
+    模式 = "L" if 灰度 else "RGB"
+    pil_图像 = Image.frombytes(模式, (宽, 高), os.urandom(宽 * 高 * len(模式)))
+    起始 = _峰值内存MB()
+    开始时间 = time.perf_counter()
+
+    if 方式 == "旧":
+        图像_np = np.array(pil_图像).astype(np.float32) / 255.0
+        if 图像_np.ndim == 2: 图像_np = np.expand_dims(图像_np, axis=2)
+        if 图像_np.shape[2] == 1: 图像_np = 图像_np.repeat(3, axis=2)
+        张量 = torch.from_numpy(图像_np).unsqueeze(0)
+    else:
+        图像_u8 = np.asarray(pil_图像)
+        if 图像_u8.ndim == 2: 图像_u8 = 图像_u8[:, :, np.newaxis]
+        张量 = 按序号加载标记图像_V5()._转为图像张量(图像_u8)
+
+    耗时 = time.perf_counter() - 开始时间
+    输出MB = 张量.numel() * 张量.element_size() / (1024 * 1024)
+    print(f"{方式}: 峰值增量 {_峰值内存MB() - 起始:.1f} MB (输出张量 {输出MB:.1f} MB), 耗时 {耗时 * 1000:.1f} ms")
+
+def main() -> None:
+    参数解析器 = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    参数解析器.add_argument("--宽", type=int, default=3840)
+    参数解析器.add_argument("--高", type=int, default=2160)
+    参数解析器.add_argument("--灰度", action="store_true")
+    参数解析器.add_argument("--单项", choices=["旧", "新"], help=argparse.SUPPRESS)
+    参数 = 参数解析器.parse_args()
+
+    if 参数.单项:
+        _运行单项(参数.单项, 参数.宽, 参数.高, 参数.灰度)
+        return
+
+    print(f"图像尺寸 {参数.宽}x{参数.高} ({'灰度' if 参数.灰度 else 'RGB'})")
+    for 方式 in ("旧", "新"):
+        命令 = [sys.executable, os.path.abspath(__file__), "--单项", 方式, "--宽", str(参数.宽), "--高", str(参数.高)]
+        if 参数.灰度:
+            命令.append("--灰度")
+        subprocess.run(命令, check=True)
+
+if __name__ == "__main__":
+    main()
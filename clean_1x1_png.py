@@ -1,5 +1,14 @@
 import os
 import glob
+import fnmatch
+import argparse
+import csv
+import json
+import shutil
+import errno
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from PIL import Image
 import sys
 import time
@@ -17,8 +26,16 @@ FOLDER_PATH_PLACEHOLDER = "Enter folder path here"
 
 RECURSIVE_SCAN_LABEL = "Recursive Scan"
 DRY_RUN_LABEL = "Dry Run (no actual deletion)"
-
-RETURN_ACTUAL_DELETED_COUNT_NAME = "Actual Deleted"
+WORKERS_TOOLTIP = "Worker threads for checking files (0 = automatic)"
+REBUILD_JOURNAL_LABEL = "Rebuild scan journal (recheck every file)"
+DETECT_ZERO_BYTE_LABEL = "Also remove zero-byte files"
+DETECT_TRUNCATED_LABEL = "Also remove truncated/corrupt PNGs (IHDR CRC, IEND)"
+DETECT_CONSTANT_COLOR_LABEL = "Also remove single-color images (decodes survivors)"
+MIN_FILE_BYTES_TOOLTIP = "Remove files smaller than this many bytes (0 = off)"
+QUARANTINE_FOLDER_PLACEHOLDER = "Quarantine folder (empty = delete permanently)"
+MAX_DIMENSION_TOOLTIP = "Remove images whose width and height are both at most this (1 = 1x1 only, 0 = off)"
+
+RETURN_ACTUAL_DELETED_COUNT_NAME = "Removed (Deleted/Quarantined)"
 RETURN_TOTAL_SCANNED_COUNT_NAME = "Total Scanned"
 RETURN_UI_SUMMARY_LOG_NAME = "UI Summary Log"
 
@@ -31,6 +48,19 @@ MSG_ERROR_INVALID_PATH = "[ComfyUI Node] Error: Invalid or unspecified folder pa
 MSG_UI_LOG_ERROR_PATH = "Error: Invalid/unspecified path"
 MSG_OP_COMPLETED = "[ComfyUI Node] Operation completed. {ui_log}"
 MSG_CLEANUP_TOOL_INIT = "[Cleanup Tool] Found {count} PNG files for checking."
+MSG_CLEANUP_TOOL_SCANNING = "[Cleanup Tool] Scanning for PNG files and checking dimensions with {workers} worker threads..."
+MSG_CLEANUP_TOOL_FOUND_MATCHES = "[Cleanup Tool] Found {count} files matching the cleanup rules."
+MSG_CLEANUP_TOOL_QUARANTINING = "[Cleanup Tool] Moving matched files to quarantine folder {folder}..."
+MSG_CLEANUP_TOOL_QUARANTINED_PROGRESS = "[Cleanup Tool] Quarantined {current}/{total} files..."
+MSG_MANIFEST_WRITTEN = "[Cleanup Tool] Manifest written to {filepath} ({count} entries). Quarantined files can be restored with undo_cleanup()."
+MSG_DRY_RUN_MORE = "  ... and {count} more"
+MSG_UNDO_RESTORED = "[Cleanup Tool] Restored {restored} quarantined files from {filepath}; {skipped} deleted/missing entries could not be restored."
+MSG_ERROR_RESTORING_FILE = "[Cleanup Tool] Error: Unable to restore {filepath} - {error}"
+MSG_ERROR_MANIFEST_RELATIVE = "[Cleanup Tool] Error: Manifest entry is not an absolute path, skipped: {filepath}"
+MSG_RULE_BREAKDOWN = "[Cleanup Tool] Matches by rule: {breakdown}"
+MSG_JOURNAL_SKIPPED = "[Cleanup Tool] Scan journal: {skipped} unchanged files skipped, {checked} files checked."
+MSG_JOURNAL_SKIPPED_SUMMARY = "Unchanged files skipped: {count}"
+MSG_ERROR_JOURNAL = "[Cleanup Tool] Warning: Unable to read or write scan journal {filepath} - {error}"
 MSG_CLEANUP_TOOL_CHECKING_SIZE = "[Cleanup Tool] Checking image dimensions..."
 MSG_CLEANUP_TOOL_CHECKED_PROGRESS = "[Cleanup Tool] Checked {current}/{total} files..."
 MSG_WARNING_UNIDENTIFIED_IMAGE = "[Cleanup Tool] Warning: Unidentified image file {filepath} (possibly corrupt or not PNG)."
@@ -38,9 +68,7 @@ MSG_ERROR_PROCESSING_FILE = "[Cleanup Tool] Error: Unknown error occurred while
 MSG_CLEANUP_TOOL_FOUND_1x1 = "[Cleanup Tool] Found {count} 1x1 pixel PNG files."
 MSG_DRY_RUN_INFO = "[Cleanup Tool] Dry run mode, no files will be actually deleted. The following files would be deleted:"
 MSG_CLEANUP_TOOL_DELETING = "[Cleanup Tool] Deleting 1x1 pixel PNG files..."
-MSG_CLEANUP_TOOL_EXECUTING_DELETE = "[Cleanup Tool] Executing deletion..."
 MSG_CLEANUP_TOOL_DELETED_PROGRESS = "[Cleanup Tool] Deleted {current}/{total} files..."
-MSG_CLEANUP_TOOL_DELETED_FILE = "[Cleanup Tool] Deleted: {filepath}"
 MSG_ERROR_DELETING_FILE = "[Cleanup Tool] Error: Unable to delete file {filepath} - {error}"
 MSG_ERROR_UNKNOWN_DELETE = "[Cleanup Tool] Error: Unknown error occurred while deleting file {filepath}: {error}"
 MSG_NO_1x1_FOUND = "[Cleanup Tool] No 1x1 pixel PNG files found."
@@ -50,11 +78,24 @@ MSG_TEST_RECURSIVE_PROMPT = "Recursive scan subfolders? (y/n): "
 MSG_TEST_DRY_RUN_PROMPT = "Dry run mode? (No actual deletion, report only) (y/n): "
 MSG_WARNING_NON_DRY_RUN = "\nWarning: You have selected non-dry run mode! This will permanently delete files. Are you sure you want to continue? (Type 'yes' to confirm): "
 MSG_OP_CANCELED = "Operation canceled."
-MSG_TEST_START_CLEANUP = "\n[Standalone Run] Starting cleanup..."
+MSG_CLI_PATHS_HELP = "Folders to scan (default: the folder containing this script)"
+MSG_CLI_RECURSIVE_HELP = "Scan subfolders recursively"
+MSG_CLI_DRY_RUN_HELP = "Only report matching files, do not delete or move anything"
+MSG_CLI_INCLUDE_HELP = "Only check files whose relative path or name matches this glob (repeatable)"
+MSG_CLI_EXCLUDE_HELP = "Skip files and folders whose relative path or name matches this glob (repeatable)"
+MSG_CLI_QUARANTINE_HELP = "Move matching files into this folder instead of deleting them (relative to each scanned folder unless absolute)"
+MSG_CLI_UNDO_HELP = "Restore the quarantined files listed in a cleanup manifest, then exit"
+MSG_CLI_REPORT_HELP = "Write a per-folder report with timings and throughput; .csv writes CSV, anything else JSON"
+MSG_CLI_TARGET_FOLDER = "\n[Standalone Run] Cleaning {path}..."
+MSG_CLI_INVALID_PATH = "[Cleanup Tool] Error: {path} is not a folder, skipped."
+MSG_CLI_PATH_SUMMARY = "[Cleanup Tool] {path}: {scanned} scanned, {matched} matched, {removed} removed in {seconds:.2f}s ({throughput:.0f} files/s)"
+MSG_CLI_REPORT_WRITTEN = "[Cleanup Tool] Report written to {filepath}"
+MSG_CLI_NO_ARGS_DRY_RUN = "[Cleanup Tool] No arguments and no terminal to ask: running as a dry run. Pass a folder path (and no --dry-run) to delete files."
 MSG_CLEANUP_COMPLETED = "\n--- Cleanup Completed ---"
 MSG_TOTAL_SCANNED_SUMMARY = "Total PNG files scanned: {count} "
-MSG_ACTUAL_DELETED_SUMMARY = "Actual 1x1 PNG files deleted: {count} "
-MSG_DRY_RUN_FOOTER = "(Dry run mode, no files were actually deleted.)"
+MSG_REMOVED_SUMMARY = "Files removed/quarantined: {count}"
+MSG_REMOVED_BY_RULE = " ({breakdown})"
+MSG_DRY_RUN_FOOTER = "(Dry run mode, no files were actually deleted or moved.)"
 MSG_PRESS_ANY_KEY = "\nPress any key to exit..."
 
 # 检测系统语言并设置中文（或回退到英文）
@@ -68,8 +109,16 @@ if current_lang and current_lang.startswith("zh"):
 
     RECURSIVE_SCAN_LABEL = "递归扫描"
     DRY_RUN_LABEL = "试运行模式 (不实际删除)"
-
-    RETURN_ACTUAL_DELETED_COUNT_NAME = "实际删除数量"
+    WORKERS_TOOLTIP = "检查文件使用的线程数 (0 = 自动)"
+    REBUILD_JOURNAL_LABEL = "重建扫描记录 (重新检查所有文件)"
+    DETECT_ZERO_BYTE_LABEL = "同时清理 0 字节文件"
+    DETECT_TRUNCATED_LABEL = "同时清理截断/损坏的PNG (IHDR CRC、IEND)"
+    DETECT_CONSTANT_COLOR_LABEL = "同时清理纯色图片 (需解码剩余文件)"
+    MIN_FILE_BYTES_TOOLTIP = "清理小于该字节数的文件 (0 = 关闭)"
+    QUARANTINE_FOLDER_PLACEHOLDER = "隔离文件夹 (留空 = 直接永久删除)"
+    MAX_DIMENSION_TOOLTIP = "清理宽和高都不超过该值的图片 (1 = 仅1x1, 0 = 关闭)"
+
+    RETURN_ACTUAL_DELETED_COUNT_NAME = "实际删除/隔离数量"
     RETURN_TOTAL_SCANNED_COUNT_NAME = "扫描PNG总数"
     RETURN_UI_SUMMARY_LOG_NAME = "UI摘要日志"
 
@@ -81,6 +130,19 @@ if current_lang and current_lang.startswith("zh"):
     MSG_UI_LOG_ERROR_PATH = "错误: 路径无效/未指定"
     MSG_OP_COMPLETED = "[ComfyUI节点] 操作完成. {ui_log}"
     MSG_CLEANUP_TOOL_INIT = "[清理工具] 发现 {count} 个PNG文件待检查."
+    MSG_CLEANUP_TOOL_SCANNING = "[清理工具] 正在使用 {workers} 个线程边扫描边检查PNG图片尺寸..."
+    MSG_CLEANUP_TOOL_FOUND_MATCHES = "[清理工具] 发现 {count} 个符合清理规则的文件."
+    MSG_CLEANUP_TOOL_QUARANTINING = "[清理工具] 正在把命中的文件移动到隔离文件夹 {folder}..."
+    MSG_CLEANUP_TOOL_QUARANTINED_PROGRESS = "[清理工具] 已隔离 {current}/{total} 个文件..."
+    MSG_MANIFEST_WRITTEN = "[清理工具] 清单已写入 {filepath} (共 {count} 条)。可用 undo_cleanup() 恢复被隔离的文件。"
+    MSG_DRY_RUN_MORE = "  ... 以及另外 {count} 个"
+    MSG_UNDO_RESTORED = "[清理工具] 已从 {filepath} 恢复 {restored} 个被隔离的文件；{skipped} 条已删除/不存在的记录无法恢复。"
+    MSG_ERROR_RESTORING_FILE = "[清理工具] 错误: 无法恢复 {filepath} - {error}"
+    MSG_ERROR_MANIFEST_RELATIVE = "[清理工具] 错误: 清单中的路径不是绝对路径，已跳过: {filepath}"
+    MSG_RULE_BREAKDOWN = "[清理工具] 各规则命中数量: {breakdown}"
+    MSG_JOURNAL_SKIPPED = "[清理工具] 扫描记录: 跳过 {skipped} 个未变化的文件，检查了 {checked} 个文件。"
+    MSG_JOURNAL_SKIPPED_SUMMARY = "跳过未变化文件: {count} 个"
+    MSG_ERROR_JOURNAL = "[清理工具] 警告: 无法读取或写入扫描记录 {filepath} - {error}"
     MSG_CLEANUP_TOOL_CHECKING_SIZE = "[清理工具] 正在检查图片尺寸..."
     MSG_CLEANUP_TOOL_CHECKED_PROGRESS = "[清理工具] 已检查 {current}/{total} 个文件..."
     MSG_WARNING_UNIDENTIFIED_IMAGE = "[清理工具] 警告: 无法识别图片文件 {filepath} (可能损坏或非PNG)."
@@ -88,9 +150,7 @@ if current_lang and current_lang.startswith("zh"):
     MSG_CLEANUP_TOOL_FOUND_1x1 = "[清理工具] 发现 {count} 个1x1像素的PNG文件."
     MSG_DRY_RUN_INFO = "[清理工具] 试运行模式，不会实际删除文件。以下文件将被删除:"
     MSG_CLEANUP_TOOL_DELETING = "[清理工具] 正在删除1x1像素的PNG文件..."
-    MSG_CLEANUP_TOOL_EXECUTING_DELETE = "[清理工具] 正在执行删除..."
     MSG_CLEANUP_TOOL_DELETED_PROGRESS = "[清理工具] 已删除 {current}/{total} 个文件..."
-    MSG_CLEANUP_TOOL_DELETED_FILE = "[清理工具] 已删除: {filepath}"
     MSG_ERROR_DELETING_FILE = "[清理工具] 错误: 无法删除文件 {filepath} - {error}"
     MSG_ERROR_UNKNOWN_DELETE = "[清理工具] 错误: 删除文件 {filepath} 时发生未知错误: {error}"
     MSG_NO_1x1_FOUND = "[清理工具] 未发现1x1像素的PNG文件。"
@@ -100,11 +160,24 @@ if current_lang and current_lang.startswith("zh"):
     MSG_TEST_DRY_RUN_PROMPT = "是否为试运行模式？(不实际删除，只报告) (y/n): "
     MSG_WARNING_NON_DRY_RUN = "\n警告：您已选择非试运行模式！这将永久删除文件。确定要继续吗？(输入 '是' 确认): "
     MSG_OP_CANCELED = "操作已取消。"
-    MSG_TEST_START_CLEANUP = "\n[独立运行] 开始清理..."
+    MSG_CLI_PATHS_HELP = "要扫描的文件夹 (默认: 脚本所在文件夹)"
+    MSG_CLI_RECURSIVE_HELP = "递归扫描子文件夹"
+    MSG_CLI_DRY_RUN_HELP = "只报告命中的文件，不删除也不移动"
+    MSG_CLI_INCLUDE_HELP = "只检查相对路径或文件名匹配该通配符的文件 (可重复)"
+    MSG_CLI_EXCLUDE_HELP = "跳过相对路径或名称匹配该通配符的文件和文件夹 (可重复)"
+    MSG_CLI_QUARANTINE_HELP = "把命中的文件移动到该文件夹而不是删除 (非绝对路径时相对于每个扫描的文件夹)"
+    MSG_CLI_UNDO_HELP = "按清理清单恢复被隔离的文件后退出"
+    MSG_CLI_REPORT_HELP = "写入每个文件夹的耗时与吞吐量报告；.csv 写 CSV，其他扩展名写 JSON"
+    MSG_CLI_TARGET_FOLDER = "\n[独立运行] 正在清理 {path}..."
+    MSG_CLI_INVALID_PATH = "[清理工具] 错误: {path} 不是文件夹，已跳过。"
+    MSG_CLI_PATH_SUMMARY = "[清理工具] {path}: 扫描 {scanned} 个，命中 {matched} 个，清理 {removed} 个，耗时 {seconds:.2f} 秒 (每秒 {throughput:.0f} 个文件)"
+    MSG_CLI_REPORT_WRITTEN = "[清理工具] 报告已写入 {filepath}"
+    MSG_CLI_NO_ARGS_DRY_RUN = "[清理工具] 没有参数且无法交互询问：按试运行模式执行。需要删除文件时请传入文件夹路径 (且不加 --dry-run)。"
     MSG_CLEANUP_COMPLETED = "\n--- 清理完成 ---"
     MSG_TOTAL_SCANNED_SUMMARY = "总共扫描PNG文件: {count} 个"
-    MSG_ACTUAL_DELETED_SUMMARY = "实际删除1x1 PNG文件: {count} 个"
-    MSG_DRY_RUN_FOOTER = "(试运行模式，未实际删除任何文件。)"
+    MSG_REMOVED_SUMMARY = "实际删除/隔离的文件: {count} 个"
+    MSG_REMOVED_BY_RULE = " ({breakdown})"
+    MSG_DRY_RUN_FOOTER = "(试运行模式，未实际删除或移动任何文件。)"
     MSG_PRESS_ANY_KEY = "\n按任意键退出..."
 
 # 尝试导入ComfyUI的进度条工具，如果不在ComfyUI环境中则跳过
@@ -114,6 +187,423 @@ try:
 except ImportError:
     _comfy_available = False
 
+# --- 并行扫描 ---
+# PNG 的宽高固定位于文件第 16-24 字节（8 字节签名 + IHDR 块头之后），检查尺寸只需读取 24 字节；
+# 只有头部不符合标准 PNG 结构时才回退到 PIL。文件由 os.scandir 流式产生，边遍历边交给线程池检查，
+# 同时在途的任务数有上限，不会先把几十万个路径全部放进内存。
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4) # 以 I/O 等待为主，线程数可以多于 CPU 核数
+PROGRESS_INTERVAL_SECONDS = 0.5 # 进度条和控制台进度的最短刷新间隔
+DRY_RUN_LIST_LIMIT = 200 # 试运行时最多逐个列出多少个文件
+
+class _ThrottledProgress:
+    """限制刷新频率的进度输出：ComfyUI 中更新进度条，独立运行时打印一行汇总。"""
+
+    def __init__(self, use_pbar, message):
+        self.pbar = comfy.utils.ProgressBar(1) if use_pbar and _comfy_available else None
+        self.message = message
+        self.last_update = 0.0
+
+    def update(self, current, total, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_update < PROGRESS_INTERVAL_SECONDS:
+            return
+        self.last_update = now
+        if self.pbar is not None:
+            self.pbar.update_absolute(current, total)
+        else:
+            print(self.message.format(current=current, total=total))
+
+# --- 扫描记录 ---
+# 每个扫描目录下保存一个 TSV：相对路径、文件大小、mtime_ns、判定结果。大小和 mtime 都未变化的文件直接沿用上次的判定，
+# 只检查新增或修改过的文件。首行记录检测规则的签名，规则变化后整个记录自动作废。读取失败的文件不写入记录，下次重新检查。
+
+JOURNAL_FILE_NAME = ".clean_1x1_png_journal.tsv"
+JOURNAL_HEADER = "# clean_1x1_png journal v1"
+VERDICT_KEEP = "ok"
+
+class _ScanJournal:
+    def __init__(self, base_path, signature, rebuild=False):
+        self.base_path = base_path
+        self.path = os.path.join(base_path, JOURNAL_FILE_NAME)
+        self.signature = signature
+        self.entries = {} if rebuild else self._load()
+        self.updated = {}
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                if f.readline().rstrip('\n') != f"{JOURNAL_HEADER}\t{self.signature}":
+                    return entries
+                for line in f:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) == 4 and fields[1].isdigit() and fields[2].isdigit():
+                        entries[fields[0]] = (int(fields[1]), int(fields[2]), fields[3])
+        except FileNotFoundError:
+            pass
+        except (OSError, UnicodeDecodeError) as e:
+            print(MSG_ERROR_JOURNAL.format(filepath=self.path, error=e))
+        return entries
+
+    def relative_path(self, filepath):
+        return os.path.relpath(filepath, self.base_path)
+
+    def lookup(self, rel_path, size, mtime_ns):
+        """文件大小和 mtime 与记录一致时返回记录的判定，否则返回 None。在线程池中调用，只读。"""
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def record(self, rel_path, size, mtime_ns, verdict):
+        self.updated[rel_path] = (size, mtime_ns, verdict)
+
+    def forget(self, rel_path):
+        self.updated.pop(rel_path, None)
+
+    def save(self, recursive, path_filter=None):
+        """
+        写入本次见到的文件；非递归扫描时保留子文件夹中的旧记录，有 path_filter 时保留被过滤掉的文件的旧记录。
+        先写临时文件再替换，中断时不会损坏旧记录。
+        """
+        entries = dict(self.updated)
+        for rel_path, entry in self.entries.items():
+            in_subfolder = os.sep in rel_path or (os.altsep and os.altsep in rel_path)
+            if (not recursive and in_subfolder) or (path_filter is not None and not path_filter(rel_path, check_parents=True)):
+                entries.setdefault(rel_path, entry)
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(f"{JOURNAL_HEADER}\t{self.signature}\n")
+                for rel_path, (size, mtime_ns, verdict) in entries.items():
+                    if '\t' not in rel_path and '\n' not in rel_path:
+                        f.write(f"{rel_path}\t{size}\t{mtime_ns}\t{verdict}\n")
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(MSG_ERROR_JOURNAL.format(filepath=self.path, error=e))
+
+def _make_path_filter(include=(), exclude=()):
+    """
+    根据 include/exclude 通配符创建 path_filter(相对路径, is_dir=False, check_parents=False)，两者都为空时返回 None。
+    通配符同时匹配以 / 分隔的相对路径和名称；exclude 命中的文件夹整个跳过，include 只作用于文件。
+    """
+    include = [pattern for pattern in include or () if pattern]
+    exclude = [pattern for pattern in exclude or () if pattern]
+    if not include and not exclude:
+        return None
+
+    def matches(rel_path, patterns):
+        name = rel_path.rsplit('/', 1)[-1]
+        return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    def path_filter(rel_path, is_dir=False, check_parents=False):
+        rel_path = rel_path.replace(os.sep, '/')
+        if matches(rel_path, exclude):
+            return False
+        if check_parents:
+            parts = rel_path.split('/')
+            if any(matches('/'.join(parts[:i]), exclude) for i in range(1, len(parts))):
+                return False
+        return is_dir or not include or matches(rel_path, include)
+
+    return path_filter
+
+def _iter_png_files(base_path, recursive, skip_dirs=(), path_filter=None):
+    """
+    流式产生 base_path 下扩展名为 .png 的文件路径。skip_dirs 中的文件夹（如隔离文件夹）不进入。
+    path_filter 为 _make_path_filter 创建的过滤函数，用相对于 base_path 的路径判断。
+    """
+    skip_dirs = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs if d}
+    pending_dirs = [base_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        if os.path.normcase(os.path.abspath(current_dir)) in skip_dirs:
+            continue
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            if entry.name.lower().endswith('.png') and (
+                                    path_filter is None or path_filter(os.path.relpath(entry.path, base_path))):
+                                yield entry.path
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            if path_filter is None or path_filter(os.path.relpath(entry.path, base_path), is_dir=True):
+                                pending_dirs.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(MSG_ERROR_PROCESSING_FILE.format(filepath=current_dir, error=e))
+
+# --- 检测规则 ---
+# 每条规则判断文件是否为需要清理的占位/垃圾文件，命中时规则名即为判定结果。规则按代价从低到高执行：
+# 只用 stat 信息的规则 < 读取几十字节的规则 < 解码像素的规则，前面的规则命中后后面的规则不再执行。
+# 文件头/尾只读取一次，由同一个 _FileProbe 在规则之间共享。
+
+PNG_IEND_CHUNK = b"IEND\xaeB`\x82"
+
+class _FileProbe:
+    def __init__(self, filepath, size):
+        self.filepath = filepath
+        self.size = size
+        self._head = None
+
+    @property
+    def head(self):
+        """文件前 33 字节：签名 + 完整的 IHDR 块（含 CRC）。"""
+        if self._head is None:
+            with open(self.filepath, 'rb') as f:
+                self._head = f.read(33)
+        return self._head
+
+    def tail(self, length=64):
+        with open(self.filepath, 'rb') as f:
+            f.seek(max(0, self.size - length))
+            return f.read(length)
+
+    def has_iend(self):
+        """按块长度逐块跳过（只读取 8 字节块头），判断 IEND 之前的块结构是否完整；IEND 之后允许有附加数据。"""
+        with open(self.filepath, 'rb') as f:
+            offset = len(PNG_SIGNATURE)
+            while offset + 12 <= self.size:
+                f.seek(offset)
+                length, chunk_type = struct.unpack(">I4s", f.read(8))
+                if chunk_type == b"IEND":
+                    return True
+                offset += 12 + length # 长度 + 类型 + 数据 + CRC
+        return False
+
+    def dimensions(self):
+        head = self.head
+        if len(head) >= 24 and head[:8] == PNG_SIGNATURE and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        with Image.open(self.filepath) as img:
+            return img.size
+
+class _DetectionRule:
+    name = ""
+    cost = 0 # 0 = 只用 stat，1 = 读取少量字节，2 = 读取头尾，10 = 解码像素
+
+    def signature(self):
+        return self.name
+
+    def matches(self, probe):
+        raise NotImplementedError
+
+class ZeroByteRule(_DetectionRule):
+    name = "zero-byte"
+    cost = 0
+
+    def matches(self, probe):
+        return probe.size == 0
+
+class MinFileSizeRule(_DetectionRule):
+    name = "small-file"
+    cost = 0
+
+    def __init__(self, min_bytes):
+        self.min_bytes = min_bytes
+
+    def signature(self):
+        return f"{self.name}<{self.min_bytes}"
+
+    def matches(self, probe):
+        return probe.size < self.min_bytes
+
+class MaxDimensionRule(_DetectionRule):
+    name = "1x1"
+    cost = 1
+
+    def __init__(self, max_dimension=1):
+        self.max_dimension = max_dimension
+        if max_dimension != 1:
+            self.name = f"max-{max_dimension}px"
+
+    def matches(self, probe):
+        width, height = probe.dimensions()
+        return width <= self.max_dimension and height <= self.max_dimension
+
+class TruncatedPngRule(_DetectionRule):
+    """IHDR 的 CRC 不正确、块结构在 IEND 之前就被截断，或非 PNG 结构且 PIL 也无法识别的文件。"""
+    name = "truncated"
+    cost = 2
+
+    def signature(self):
+        # 旧版本只在文件末尾查找 IEND，会误判带附加数据的 PNG；更换签名让旧的扫描记录失效
+        return f"{self.name}:chunks"
+
+    def matches(self, probe):
+        head = probe.head
+        if head[:8] != PNG_SIGNATURE:
+            try:
+                with Image.open(probe.filepath):
+                    return False # 扩展名为 .png 的其它格式图片，交给其它规则判断
+            except Exception:
+                return True
+        if len(head) < 33 or head[12:16] != b"IHDR":
+            return True
+        if zlib.crc32(head[12:29]) != struct.unpack(">I", head[29:33])[0]:
+            return True
+        # 常见情况 IEND 就在文件末尾；找不到时（IEND 之后有附加数据或文件被截断）再逐块检查
+        return PNG_IEND_CHUNK not in probe.tail() and not probe.has_iend()
+
+class ConstantColorRule(_DetectionRule):
+    """所有像素颜色相同（包括全透明、全黑的占位图）。PNG 无法部分解码，但统计极值不会生成额外的图像副本。"""
+    name = "constant-color"
+    cost = 10
+
+    def matches(self, probe):
+        with Image.open(probe.filepath) as img:
+            img.draft(img.mode, (64, 64)) # JPEG 等格式可按比例缩小解码
+            extrema = img.getextrema()
+        if not isinstance(extrema[0], tuple):
+            extrema = (extrema,)
+        return all(low == high for low, high in extrema)
+
+def build_detection_rules(max_dimension=1, detect_zero_byte=False, min_file_bytes=0, detect_truncated=False, detect_constant_color=False):
+    """按参数创建检测规则，并按代价从低到高排序。"""
+    rules = []
+    if detect_zero_byte:
+        rules.append(ZeroByteRule())
+    if min_file_bytes > 0:
+        rules.append(MinFileSizeRule(min_file_bytes))
+    if max_dimension > 0:
+        rules.append(MaxDimensionRule(max_dimension))
+    if detect_truncated:
+        rules.append(TruncatedPngRule())
+    if detect_constant_color:
+        rules.append(ConstantColorRule())
+    return sorted(rules, key=lambda rule: rule.cost)
+
+def _rules_signature(rules):
+    return ";".join(rule.signature() for rule in rules)
+
+def _format_rule_counts(counts):
+    return ", ".join(f"{name}: {count}" for name, count in sorted(counts.items()))
+
+def _removed_summary(count, removed_by_rule):
+    """“实际删除/隔离的文件: N 个 (1x1: 2, truncated: 1)”，没有清理任何文件时不附带规则明细。"""
+    summary = MSG_REMOVED_SUMMARY.format(count=count)
+    if removed_by_rule:
+        summary += MSG_REMOVED_BY_RULE.format(breakdown=_format_rule_counts(removed_by_rule))
+    return summary
+
+def _check_png(filepath, rules, journal=None):
+    """
+    返回 (路径, 判定, 警告消息, 大小, mtime_ns, 是否沿用记录)。判定为 VERDICT_KEEP 或命中规则的名称，出错时为 None。
+    某条规则出错（如无法识别的图片）时继续尝试后面的规则，都未命中才报告第一个错误。在线程池中运行，不直接打印。
+    """
+    size = mtime_ns = None
+    try:
+        stat = os.stat(filepath)
+        size, mtime_ns = stat.st_size, stat.st_mtime_ns
+    except Exception as e:
+        return filepath, None, MSG_ERROR_PROCESSING_FILE.format(filepath=filepath, error=e), size, mtime_ns, False
+    if journal is not None:
+        verdict = journal.lookup(journal.relative_path(filepath), size, mtime_ns)
+        if verdict is not None:
+            return filepath, verdict, None, size, mtime_ns, True
+
+    probe = _FileProbe(filepath, size)
+    first_error = None
+    for rule in rules:
+        try:
+            if rule.matches(probe):
+                return filepath, rule.name, None, size, mtime_ns, False
+        except Image.UnidentifiedImageError:
+            first_error = first_error or MSG_WARNING_UNIDENTIFIED_IMAGE.format(filepath=filepath)
+        except Exception as e:
+            first_error = first_error or MSG_ERROR_PROCESSING_FILE.format(filepath=filepath, error=e)
+    if first_error:
+        return filepath, None, first_error, size, mtime_ns, False
+    return filepath, VERDICT_KEEP, None, size, mtime_ns, False
+
+def _parallel_check(filepaths, check, workers, on_result):
+    """用有界的在途任务窗口把 filepaths 交给线程池中的 check，结果在调用线程中依次交给 on_result。"""
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for filepath in filepaths:
+            in_flight.add(pool.submit(check, filepath))
+            if len(in_flight) >= workers * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(future.result())
+        for future in in_flight:
+            on_result(future.result())
+
+# --- 删除 / 隔离 ---
+# 命中的文件在线程池中删除，或用同一卷内的 os.replace 移动到隔离文件夹（保留相对路径，跨卷时回退到复制后删除）。
+# 每处理一个文件在基础文件夹的清单中追加一行：操作、原路径、隔离后的路径、命中的规则；undo_cleanup 按清单把隔离的文件移回原处。
+
+MANIFEST_FILE_PREFIX = ".clean_1x1_png_manifest_"
+MANIFEST_HEADER = "# clean_1x1_png manifest v1"
+ACTION_DELETED = "deleted"
+ACTION_QUARANTINED = "quarantined"
+
+def _unique_destination(destination):
+    base, ext = os.path.splitext(destination)
+    suffix = 1
+    while os.path.exists(destination):
+        destination = f"{base}_{suffix}{ext}"
+        suffix += 1
+    return destination
+
+def _remove_file(filepath, base_path, quarantine_folder):
+    """返回 (路径, 操作, 隔离后的路径, 错误消息)。在线程池中运行。"""
+    try:
+        if not quarantine_folder:
+            os.remove(filepath)
+            return filepath, ACTION_DELETED, "", None
+        destination = os.path.join(quarantine_folder, os.path.relpath(filepath, base_path))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        destination = _unique_destination(destination)
+        try:
+            os.replace(filepath, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(filepath, destination)
+        return filepath, ACTION_QUARANTINED, destination, None
+    except OSError as e:
+        return filepath, None, "", MSG_ERROR_DELETING_FILE.format(filepath=filepath, error=e)
+    except Exception as e:
+        return filepath, None, "", MSG_ERROR_UNKNOWN_DELETE.format(filepath=filepath, error=e)
+
+def undo_cleanup(manifest_path):
+    """
+    把清单中被隔离的文件移回原处，返回 (恢复数量, 无法恢复数量)。已永久删除的文件无法恢复。
+    清单中的路径必须是绝对路径，不依赖运行时的工作目录；相对路径的记录会被跳过。
+    """
+    restored = skipped = 0
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if line.startswith('#') or len(fields) < 3:
+                continue
+            action, original, quarantined = fields[:3]
+            if action != ACTION_QUARANTINED:
+                skipped += 1
+                continue
+            if not (os.path.isabs(original) and os.path.isabs(quarantined)):
+                print(MSG_ERROR_MANIFEST_RELATIVE.format(filepath=quarantined or original))
+                skipped += 1
+                continue
+            if not os.path.exists(quarantined):
+                skipped += 1
+                continue
+            try:
+                os.makedirs(os.path.dirname(original), exist_ok=True)
+                shutil.move(quarantined, _unique_destination(original))
+                restored += 1
+            except OSError as e:
+                print(MSG_ERROR_RESTORING_FILE.format(filepath=original, error=e))
+                skipped += 1
+    print(MSG_UNDO_RESTORED.format(restored=restored, filepath=manifest_path, skipped=skipped))
+    return restored, skipped
+
 class ScanAndDelete1x1PNG:
     def __init__(self):
         pass
@@ -130,6 +620,16 @@ class ScanAndDelete1x1PNG:
                 "recursive_scan": ("BOOLEAN", {"default": True, "label_on": RECURSIVE_SCAN_LABEL, "label_off": RECURSIVE_SCAN_LABEL}),
                 "dry_run": ("BOOLEAN", {"default": True, "label_on": DRY_RUN_LABEL, "label_off": DRY_RUN_LABEL}),
             },
+            "optional": {
+                "workers": ("INT", {"default": 0, "min": 0, "max": 256, "tooltip": WORKERS_TOOLTIP}),
+                "quarantine_folder": ("STRING", {"default": "", "placeholder": QUARANTINE_FOLDER_PLACEHOLDER}),
+                "rebuild_journal": ("BOOLEAN", {"default": False, "label_on": REBUILD_JOURNAL_LABEL, "label_off": REBUILD_JOURNAL_LABEL}),
+                "max_dimension": ("INT", {"default": 1, "min": 0, "max": 65535, "tooltip": MAX_DIMENSION_TOOLTIP}),
+                "detect_zero_byte": ("BOOLEAN", {"default": False, "label_on": DETECT_ZERO_BYTE_LABEL, "label_off": DETECT_ZERO_BYTE_LABEL}),
+                "min_file_bytes": ("INT", {"default": 0, "min": 0, "max": 1 << 30, "tooltip": MIN_FILE_BYTES_TOOLTIP}),
+                "detect_truncated": ("BOOLEAN", {"default": False, "label_on": DETECT_TRUNCATED_LABEL, "label_off": DETECT_TRUNCATED_LABEL}),
+                "detect_constant_color": ("BOOLEAN", {"default": False, "label_on": DETECT_CONSTANT_COLOR_LABEL, "label_off": DETECT_CONSTANT_COLOR_LABEL}),
+            },
         }
 
     # 使用全局变量汉化输出名称
@@ -139,7 +639,8 @@ class ScanAndDelete1x1PNG:
     CATEGORY = CATEGORY_TEXT # 节点在ComfyUI UI中的分类
     OUTPUT_NODE = False
 
-    def execute(self, any, folder_path, recursive_scan, dry_run):
+    def execute(self, any, folder_path, recursive_scan, dry_run, workers=0, quarantine_folder="", rebuild_journal=False,
+                max_dimension=1, detect_zero_byte=False, min_file_bytes=0, detect_truncated=False, detect_constant_color=False):
         # 核心处理逻辑将在此被调用
         print(MSG_NODE_START_OP)
         print(MSG_TARGET_FOLDER.format(folder_path=folder_path))
@@ -155,91 +656,143 @@ class ScanAndDelete1x1PNG:
             folder_path,
             recursive_scan,
             dry_run,
-            is_comfyui_node=True
+            is_comfyui_node=True,
+            workers=workers,
+            quarantine_folder=quarantine_folder.strip(),
+            rebuild_journal=rebuild_journal,
+            rules=build_detection_rules(max_dimension, detect_zero_byte, min_file_bytes, detect_truncated, detect_constant_color)
         )
 
-        ui_log = MSG_TOTAL_SCANNED_SUMMARY.format(count=scanned_count) + ", " + MSG_ACTUAL_DELETED_SUMMARY.format(count=deleted_count)
+        ui_log = MSG_TOTAL_SCANNED_SUMMARY.format(count=scanned_count) + ", " + _removed_summary(deleted_count, self.last_stats["removed_by_rule"])
+        ui_log += ", " + MSG_JOURNAL_SKIPPED_SUMMARY.format(count=self.last_stats["skipped"])
         print(MSG_OP_COMPLETED.format(ui_log=ui_log))
         return (deleted_count, scanned_count, ui_log)
 
-    def _process_png_files(self, base_path, recursive, dry_run, is_comfyui_node=False):
+    def _process_png_files(self, base_path, recursive, dry_run, is_comfyui_node=False, workers=None, rebuild_journal=False, rules=None,
+                           quarantine_folder="", include=None, exclude=None):
         """
         核心处理函数，扫描并处理1x1像素的PNG图片。
+        workers 为检查尺寸的线程数，None 或 0 时使用 DEFAULT_SCAN_WORKERS。
+        rebuild_journal 为 True 时忽略已有的扫描记录，重新检查所有文件；扫描记录只在实际运行（非试运行）时保存。
+        rules 为 build_detection_rules 创建的检测规则，None 时只检测 1x1。
+        quarantine_folder 非空时把命中的文件移动到该文件夹（相对路径相对于 base_path）而不是永久删除，并写入可撤销的清单。
+        include/exclude 为通配符列表，见 _make_path_filter。
+        返回 (扫描总数, 实际删除数)，跳过/检查数量等统计保存在 self.last_stats 中。
         """
-        png_files = []
-        if recursive:
-            # os.walk 递归遍历
-            for root, _, files in os.walk(base_path):
-                for file in files:
-                    if file.lower().endswith('.png'):
-                        png_files.append(os.path.join(root, file))
-        else:
-            # 非递归只扫描当前目录
-            for file in os.listdir(base_path):
-                if file.lower().endswith('.png') and os.path.isfile(os.path.join(base_path, file)):
-                    png_files.append(os.path.join(base_path, file))
-
-        print(MSG_CLEANUP_TOOL_INIT.format(count=len(png_files)))
-        scanned_count = len(png_files)
+        workers = workers or DEFAULT_SCAN_WORKERS
+        if quarantine_folder and not os.path.isabs(quarantine_folder):
+            quarantine_folder = os.path.join(base_path, quarantine_folder)
+        if rules is None:
+            rules = build_detection_rules()
+        journal = _ScanJournal(base_path, _rules_signature(rules), rebuild=rebuild_journal)
+        path_filter = _make_path_filter(include, exclude)
+        start_time = time.monotonic()
+        matched_by_rule = {}
+        verdicts = {}
         files_to_delete = []
-
-        # 初始化进度条
-        if is_comfyui_node and _comfy_available:
-            pbar = comfy.utils.ProgressBar(len(png_files))
-        else:
-            print(MSG_CLEANUP_TOOL_CHECKING_SIZE)
-
-        for i, filepath in enumerate(png_files):
-            if is_comfyui_node and _comfy_available:
-                pbar.update_absolute(i, len(png_files))
-            elif (i + 1) % 100 == 0 or (i + 1) == len(png_files): # 每100个或最后一个文件更新进度
-                print(MSG_CLEANUP_TOOL_CHECKED_PROGRESS.format(current=i+1, total=len(png_files)))
-
-            try:
-                # 使用 with 语句确保文件句柄在检查后立即释放，避免文件占用问题
-                with Image.open(filepath) as img:
-                    width, height = img.size
-                    if width == 1 and height == 1:
-                        files_to_delete.append(filepath)
-            except Image.UnidentifiedImageError:
-                print(MSG_WARNING_UNIDENTIFIED_IMAGE.format(filepath=filepath))
-            except Exception as e:
-                print(MSG_ERROR_PROCESSING_FILE.format(filepath=filepath, error=e))
+        scanned_count = 0
+        skipped_count = 0
+
+        # 文件总数在扫描结束前未知，进度条的总数随已发现的文件数增长
+        progress = _ThrottledProgress(is_comfyui_node, MSG_CLEANUP_TOOL_CHECKED_PROGRESS)
+        print(MSG_CLEANUP_TOOL_SCANNING.format(workers=workers))
+
+        discovered = [0]
+        def counted_files():
+            for filepath in _iter_png_files(base_path, recursive, skip_dirs=[quarantine_folder], path_filter=path_filter):
+                discovered[0] += 1
+                yield filepath
+
+        def on_result(result):
+            nonlocal scanned_count, skipped_count
+            filepath, verdict, warning, size, mtime_ns, skipped = result
+            scanned_count += 1
+            skipped_count += skipped
+            if warning:
+                print(warning)
+            else:
+                journal.record(journal.relative_path(filepath), size, mtime_ns, verdict)
+                if verdict != VERDICT_KEEP:
+                    files_to_delete.append(filepath)
+                    verdicts[filepath] = verdict
+                    matched_by_rule[verdict] = matched_by_rule.get(verdict, 0) + 1
+            progress.update(scanned_count, discovered[0])
+
+        _parallel_check(counted_files(), lambda filepath: _check_png(filepath, rules, journal), workers, on_result)
+        progress.update(scanned_count, discovered[0], force=True)
+        print(MSG_CLEANUP_TOOL_INIT.format(count=scanned_count))
+        print(MSG_JOURNAL_SKIPPED.format(skipped=skipped_count, checked=scanned_count - skipped_count))
+        self.last_stats = {"scanned": scanned_count, "skipped": skipped_count, "checked": scanned_count - skipped_count,
+                           "matched_by_rule": matched_by_rule, "removed_by_rule": {},
+                           "scan_seconds": time.monotonic() - start_time, "remove_seconds": 0.0}
+        # 线程池完成顺序不确定，排序后输出稳定
+        files_to_delete.sort()
 
         deleted_count = 0
         if files_to_delete:
-            print(MSG_CLEANUP_TOOL_FOUND_1x1.format(count=len(files_to_delete)))
+            if set(matched_by_rule) == {"1x1"}:
+                print(MSG_CLEANUP_TOOL_FOUND_1x1.format(count=len(files_to_delete)))
+            else:
+                print(MSG_CLEANUP_TOOL_FOUND_MATCHES.format(count=len(files_to_delete)))
+            print(MSG_RULE_BREAKDOWN.format(breakdown=_format_rule_counts(matched_by_rule)))
             if dry_run:
                 print(MSG_DRY_RUN_INFO)
-                for f in files_to_delete:
+                for f in files_to_delete[:DRY_RUN_LIST_LIMIT]:
                     print(f"  - {f}")
+                if len(files_to_delete) > DRY_RUN_LIST_LIMIT:
+                    print(MSG_DRY_RUN_MORE.format(count=len(files_to_delete) - DRY_RUN_LIST_LIMIT))
             else:
-                print(MSG_CLEANUP_TOOL_DELETING)
-                # 再次初始化进度条，用于删除阶段
-                if is_comfyui_node and _comfy_available:
-                    pbar_delete = comfy.utils.ProgressBar(len(files_to_delete))
-                else:
-                    print(MSG_CLEANUP_TOOL_EXECUTING_DELETE)
-
-                for j, filepath in enumerate(files_to_delete):
-                    if is_comfyui_node and _comfy_available:
-                        pbar_delete.update_absolute(j, len(files_to_delete))
-                    elif (j + 1) % 10 == 0 or (j + 1) == len(files_to_delete): # 每10个或最后一个文件更新进度
-                        print(MSG_CLEANUP_TOOL_DELETED_PROGRESS.format(current=j+1, total=len(files_to_delete)))
-
-                    try:
-                        os.remove(filepath)
-                        deleted_count += 1
-                        print(MSG_CLEANUP_TOOL_DELETED_FILE.format(filepath=filepath))
-                    except OSError as e:
-                        print(MSG_ERROR_DELETING_FILE.format(filepath=filepath, error=e))
-                    except Exception as e:
-                        print(MSG_ERROR_UNKNOWN_DELETE.format(filepath=filepath, error=e))
+                deleted_count = self._remove_matched_files(files_to_delete, verdicts, base_path, quarantine_folder,
+                                                           journal, workers, is_comfyui_node)
         else:
             print(MSG_NO_1x1_FOUND)
 
+        # 试运行不在目标文件夹中写入任何文件；已有的扫描记录仍会用于跳过未变化的文件
+        if not dry_run:
+            journal.save(recursive, path_filter)
         return scanned_count, deleted_count
 
+    def _remove_matched_files(self, files_to_delete, verdicts, base_path, quarantine_folder, journal, workers, is_comfyui_node):
+        """在线程池中删除或隔离文件，进度限频输出，每个成功的文件写入清单。返回成功数量。"""
+        if quarantine_folder:
+            print(MSG_CLEANUP_TOOL_QUARANTINING.format(folder=quarantine_folder))
+            progress = _ThrottledProgress(is_comfyui_node, MSG_CLEANUP_TOOL_QUARANTINED_PROGRESS)
+        else:
+            print(MSG_CLEANUP_TOOL_DELETING)
+            progress = _ThrottledProgress(is_comfyui_node, MSG_CLEANUP_TOOL_DELETED_PROGRESS)
+
+        start_time = time.monotonic()
+        manifest_path = _unique_destination(os.path.join(os.path.abspath(base_path), f"{MANIFEST_FILE_PREFIX}{time.strftime('%Y%m%d_%H%M%S')}.tsv"))
+        removed_count = 0
+        removed_by_rule = self.last_stats["removed_by_rule"]
+        processed = 0
+        total = len(files_to_delete)
+        with open(manifest_path, 'w', encoding='utf-8', newline='\n') as manifest:
+            manifest.write(f"{MANIFEST_HEADER}\t{os.path.abspath(base_path)}\n")
+
+            def on_result(result):
+                nonlocal removed_count, processed
+                filepath, action, destination, error = result
+                processed += 1
+                if error:
+                    print(error)
+                else:
+                    removed_count += 1
+                    rule = verdicts.get(filepath, '')
+                    removed_by_rule[rule] = removed_by_rule.get(rule, 0) + 1
+                    journal.forget(journal.relative_path(filepath))
+                    # 写入绝对路径，从任意工作目录运行 undo_cleanup 都能找到文件
+                    destination = os.path.abspath(destination) if destination else ""
+                    manifest.write(f"{action}\t{os.path.abspath(filepath)}\t{destination}\t{verdicts.get(filepath, '')}\n")
+                progress.update(processed, total)
+
+            _parallel_check(files_to_delete, lambda filepath: _remove_file(filepath, base_path, quarantine_folder), workers, on_result)
+            progress.update(processed, total, force=True)
+        print(MSG_MANIFEST_WRITTEN.format(filepath=manifest_path, count=removed_count))
+        self.last_stats["manifest"] = manifest_path
+        self.last_stats["remove_seconds"] = time.monotonic() - start_time
+        return removed_count
+
 # --- 节点注册信息 ---
 NODE_CLASS_MAPPINGS = {
     "AutoClean1x1PNG": ScanAndDelete1x1PNG
@@ -251,41 +804,145 @@ NODE_DISPLAY_NAME_MAPPINGS = {
 # --- 节点注册信息结束 ---
 
 
-# 独立运行模式
-if __name__ == "__main__":
+# --- 命令行 ---
+# 与节点共用 _process_png_files。带参数运行时不交互提问，可直接放进 cron / 计划任务；
+# 不带任何参数在终端中运行（把脚本放进文件夹双击运行）时仍按原来的方式逐项询问，结束后等待按键再关闭窗口；
+# 不带参数又没有终端（cron、管道、CI）时只做试运行，不会删除脚本所在文件夹中的任何文件。
+
+REPORT_FIELDS = ["path", "dry_run", "scanned", "skipped", "checked", "matched", "removed", "matched_by_rule", "removed_by_rule",
+                 "scan_seconds", "remove_seconds", "total_seconds", "files_per_second", "manifest"]
+
+def _build_arg_parser():
+    parser = argparse.ArgumentParser(description=MSG_TEST_TITLE)
+    parser.add_argument("paths", nargs="*", help=MSG_CLI_PATHS_HELP)
+    parser.add_argument("-r", "--recursive", action="store_true", help=MSG_CLI_RECURSIVE_HELP)
+    parser.add_argument("-n", "--dry-run", action="store_true", help=MSG_CLI_DRY_RUN_HELP)
+    parser.add_argument("-w", "--workers", type=int, default=0, help=WORKERS_TOOLTIP)
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB", help=MSG_CLI_INCLUDE_HELP)
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help=MSG_CLI_EXCLUDE_HELP)
+    parser.add_argument("--rebuild", action="store_true", help=REBUILD_JOURNAL_LABEL)
+    parser.add_argument("--quarantine", default="", metavar="FOLDER", help=MSG_CLI_QUARANTINE_HELP)
+    parser.add_argument("--undo", action="append", default=[], metavar="MANIFEST", help=MSG_CLI_UNDO_HELP)
+    parser.add_argument("--report", metavar="FILE", help=MSG_CLI_REPORT_HELP)
+    parser.add_argument("--max-dimension", type=int, default=1, help=MAX_DIMENSION_TOOLTIP)
+    parser.add_argument("--zero-byte", action="store_true", help=DETECT_ZERO_BYTE_LABEL)
+    parser.add_argument("--min-bytes", type=int, default=0, help=MIN_FILE_BYTES_TOOLTIP)
+    parser.add_argument("--truncated", action="store_true", help=DETECT_TRUNCATED_LABEL)
+    parser.add_argument("--constant-color", action="store_true", help=DETECT_CONSTANT_COLOR_LABEL)
+    return parser
+
+def _write_report(filepath, rows):
+    if filepath.lower().endswith('.csv'):
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                flat = dict(row, **{field: ";".join(f"{name}:{count}" for name, count in sorted(row[field].items()))
+                                    for field in ("matched_by_rule", "removed_by_rule")})
+                writer.writerow(flat)
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({"generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "folders": rows}, f, ensure_ascii=False, indent=2)
+    print(MSG_CLI_REPORT_WRITTEN.format(filepath=filepath))
+
+def _interactive_argv():
+    """逐项询问后返回等价的命令行参数，用户取消时返回 None。"""
+    argv = []
+    if input(MSG_TEST_RECURSIVE_PROMPT).lower() == 'y':
+        argv.append("--recursive")
+    if input(MSG_TEST_DRY_RUN_PROMPT).lower() == 'y':
+        argv.append("--dry-run")
+    elif input(MSG_WARNING_NON_DRY_RUN) not in ('是', 'yes'):
+        print(MSG_OP_CANCELED)
+        return None
+    return argv
+
+def main(argv=None):
+    """命令行入口，返回退出码：全部文件夹有效时为 0，否则为 1。"""
+    interactive = False
+    if argv is None:
+        argv = sys.argv[1:]
+        interactive = not argv and sys.stdin.isatty()
     print(MSG_TEST_TITLE)
-
-    # 获取脚本所在目录
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    print(MSG_TEST_SCRIPT_DIR.format(script_dir=script_dir))
-
-    # 询问是否递归扫描
-    recursive_input = input(MSG_TEST_RECURSIVE_PROMPT).lower()
-    recursive_scan = recursive_input == 'y'
-
-    # 询问是否为试运行
-    dry_run_input = input(MSG_TEST_DRY_RUN_PROMPT).lower()
-    dry_run = dry_run_input == 'y'
-
-    if not dry_run:
-        confirm = input(MSG_WARNING_NON_DRY_RUN)
-        if confirm != '是': # 确保这里是中文“是”
-            print(MSG_OP_CANCELED)
-            sys.exit(0)
-
+    if interactive:
+        print(MSG_TEST_SCRIPT_DIR.format(script_dir=os.path.dirname(os.path.abspath(__file__))))
+        argv = _interactive_argv()
+        if argv is None:
+            return 0
+    elif not argv:
+        print(MSG_CLI_NO_ARGS_DRY_RUN)
+        argv = ["--dry-run"]
+
+    exit_code = _run_cli(_build_arg_parser().parse_args(argv))
+    if interactive:
+        input(MSG_PRESS_ANY_KEY)
+    return exit_code
+
+def _run_cli(args):
+    """按解析好的参数逐个清理文件夹（或执行 --undo），打印汇总并按需写入报告，返回退出码。"""
+    if args.undo:
+        for manifest_path in args.undo:
+            undo_cleanup(manifest_path)
+        return 0
+
+    paths = args.paths or [os.path.dirname(os.path.abspath(__file__))]
+    rules = build_detection_rules(args.max_dimension, args.zero_byte, args.min_bytes, args.truncated, args.constant_color)
     cleaner = ScanAndDelete1x1PNG()
-    print(MSG_TEST_START_CLEANUP)
-    scanned_count, deleted_count = cleaner._process_png_files(
-        script_dir,
-        recursive_scan,
-        dry_run,
-        is_comfyui_node=False
-    )
+    rows = []
+    exit_code = 0
+    for path in paths:
+        if not os.path.isdir(path):
+            print(MSG_CLI_INVALID_PATH.format(path=path))
+            exit_code = 1
+            continue
+        print(MSG_CLI_TARGET_FOLDER.format(path=path))
+        start_time = time.monotonic()
+        scanned_count, removed_count = cleaner._process_png_files(
+            path,
+            args.recursive,
+            args.dry_run,
+            workers=args.workers,
+            rebuild_journal=args.rebuild,
+            rules=rules,
+            quarantine_folder=args.quarantine,
+            include=args.include,
+            exclude=args.exclude
+        )
+        total_seconds = time.monotonic() - start_time
+        stats = cleaner.last_stats
+        rows.append({
+            "path": os.path.abspath(path),
+            "dry_run": args.dry_run,
+            "scanned": scanned_count,
+            "skipped": stats["skipped"],
+            "checked": stats["checked"],
+            "matched": sum(stats["matched_by_rule"].values()),
+            "removed": removed_count,
+            "matched_by_rule": stats["matched_by_rule"],
+            "removed_by_rule": stats["removed_by_rule"],
+            "scan_seconds": round(stats["scan_seconds"], 3),
+            "remove_seconds": round(stats["remove_seconds"], 3),
+            "total_seconds": round(total_seconds, 3),
+            "files_per_second": round(scanned_count / total_seconds, 1) if total_seconds > 0 else 0.0,
+            "manifest": stats.get("manifest", ""),
+        })
 
     print(MSG_CLEANUP_COMPLETED)
-    print(MSG_TOTAL_SCANNED_SUMMARY.format(count=scanned_count))
-    print(MSG_ACTUAL_DELETED_SUMMARY.format(count=deleted_count))
-    if dry_run:
+    for row in rows:
+        print(MSG_CLI_PATH_SUMMARY.format(path=row["path"], scanned=row["scanned"], matched=row["matched"], removed=row["removed"],
+                                          seconds=row["total_seconds"], throughput=row["files_per_second"]))
+    print(MSG_TOTAL_SCANNED_SUMMARY.format(count=sum(row["scanned"] for row in rows)))
+    removed_by_rule = {}
+    for row in rows:
+        for rule, count in row["removed_by_rule"].items():
+            removed_by_rule[rule] = removed_by_rule.get(rule, 0) + count
+    print(_removed_summary(sum(row["removed"] for row in rows), removed_by_rule))
+    if args.dry_run:
         print(MSG_DRY_RUN_FOOTER)
-    
-    input(MSG_PRESS_ANY_KEY)
\ No newline at end of file
+    if args.report:
+        _write_report(args.report, rows)
+    return exit_code
+
+# 独立运行模式
+if __name__ == "__main__":
+    sys.exit(main())
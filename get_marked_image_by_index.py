@@ -8,13 +8,436 @@ from PIL import Image, ImageOps
 import torch
 import numpy as np
 import random # [新增] 导入random模块
-from typing import List, Dict, Any, Tuple
+import math
+import struct
+import itertools
+import bisect
+import fnmatch
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Tuple, Optional, Iterator
+from collections import deque
+
+try:
+    from .image_header_reader import 读取图像头部元数据, 提取嵌入参数, 解析EXIF
+except ImportError:
+    from image_header_reader import 读取图像头部元数据, 提取嵌入参数, 解析EXIF
 
 # --- 辅助函数 ---
 
 def _自然排序键(s: str, _nsre=re.compile('([0-9]+)')) -> List[Any]:
     return [int(text) if text.isdigit() else text.lower() for text in _nsre.split(s)]
 
+# --- 文件夹索引缓存 ---
+
+# 目录 mtime 距当前时间小于该值时不信任它（文件系统时间粒度可能很粗，同一时间片内的写入无法区分）
+_目录时间可信间隔_ns = 2_000_000_000
+_索引缓存上限 = 16
+_扫描最大线程数 = 8
+
+def _拆分列表(文本: str) -> List[str]:
+    """按分号或换行拆分输入框中的多个路径/模式。"""
+    return [项.strip() for 项 in re.split(r"[;\n]", 文本 or "") if 项.strip()]
+
+def _编译路径模式(模式文本: str) -> Tuple[Tuple[str, "re.Pattern"], ...]:
+    """
+    编译分号/换行分隔的模式列表，返回 (匹配方式, 正则) 元组，匹配方式为 "名称" / "路径" / "正则"。
+    默认按 glob 解释并完整匹配：不含 '/' 的模式匹配文件（夹）名，含 '/' 的匹配整个相对路径；
+    以 're:' 开头的按正则在相对路径中搜索（需要锚定时自行加 ^ / $）。
+    """
+    标志 = re.IGNORECASE if os.name == "nt" else 0
+    结果 = []
+    for 模式 in _拆分列表(模式文本):
+        if 模式.startswith("re:"):
+            结果.append(("正则", re.compile(模式[3:], 标志)))
+        else:
+            模式 = 模式.replace("\\", "/")
+            结果.append(("路径" if "/" in 模式 else "名称", re.compile(fnmatch.translate(模式), 标志)))
+    return tuple(结果)
+
+def _模式匹配(模式列表: Tuple[Tuple[str, "re.Pattern"], ...], 相对路径: str, 名称: str) -> bool:
+    for 匹配方式, 正则 in 模式列表:
+        if 匹配方式 == "正则":
+            if 正则.search(相对路径): return True
+        elif 正则.fullmatch(相对路径 if 匹配方式 == "路径" else 名称):
+            return True
+    return False
+
+class _文件夹索引:
+    """
+    一组根目录（可递归）按扩展名、标记、包含/排除模式和排序方式筛选后的有序文件索引。
+    每个已扫描目录记录自己的 mtime；刷新时只 stat 已知目录，对 mtime 变化的目录用 os.scandir 重新列出
+    （多个目录时按层并行扫描），再与上次结果比对，只对新增/删除的文件做二分插入和删除，不再整体重新排序。
+    注意：原地覆盖文件内容不会改变目录 mtime，按修改时间排序时这类变化要等到目录变化后才会体现。
+    """
+
+    def __init__(self, 根目录列表: Tuple[str, ...], 递归: bool, 有效扩展名集合: frozenset, 搜索标记: str, 排除标记: str,
+                 包含模式文本: str, 排除模式文本: str, 排序方式值: str):
+        self.根目录列表 = 根目录列表
+        self.递归 = 递归
+        self.有效扩展名集合 = 有效扩展名集合
+        self.搜索标记 = 搜索标记
+        self.排除标记 = 排除标记
+        self._包含模式 = _编译路径模式(包含模式文本)
+        self._排除模式 = _编译路径模式(排除模式文本)
+        self.按修改时间 = "修改时间" in 排序方式值
+        self.降序 = "降序" in 排序方式值
+        self.版本 = 0
+        self.采样器缓存: Dict[str, "_采样器"] = {}
+        self._目录修改时间: Dict[str, Optional[int]] = {}          # 已扫描目录 -> mtime_ns（None 表示下次必须复查）
+        self._目录根: Dict[str, str] = {}                          # 已扫描目录 -> 所属根目录
+        self._目录内容: Dict[str, Tuple[frozenset, frozenset]] = {}  # 已扫描目录 -> (文件完整路径集合, 子目录集合)
+        self._文件信息: Dict[str, Tuple[str, float]] = {}          # 完整路径 -> (相对路径, 修改时间)
+        self._有序键: List[tuple] = []
+        self._锁 = threading.Lock()
+
+    def _排序键(self, 完整路径: str, 相对路径: str, 修改时间: float) -> tuple:
+        if self.按修改时间:
+            return (修改时间, _自然排序键(相对路径), 完整路径)
+        return (_自然排序键(相对路径), 完整路径)
+
+    def _扫描目录(self, 目录: str, 根目录: str) -> Tuple[str, Optional[int], Dict[str, Tuple[str, Optional[float]]], List[str]]:
+        """
+        列出单个目录（在线程池中运行，只读取 self._文件信息）。返回 (目录, mtime_ns, 文件, 子目录)，
+        文件为 {完整路径: (相对路径, 修改时间)}，已知文件的修改时间为 None（沿用旧值），目录已不存在时 mtime 为 None。
+        """
+        文件: Dict[str, Tuple[str, Optional[float]]] = {}
+        子目录: List[str] = []
+        try:
+            目录修改时间 = os.stat(目录).st_mtime_ns
+            with os.scandir(目录) as 迭代器:
+                for 条目 in 迭代器:
+                    相对路径 = os.path.relpath(条目.path, 根目录).replace(os.sep, "/")
+                    try:
+                        是目录 = 条目.is_dir()
+                    except OSError:
+                        continue
+                    if 是目录:
+                        if self.递归 and not _模式匹配(self._排除模式, 相对路径, 条目.name):
+                            子目录.append(条目.path)
+                        continue
+                    文件基础名, 扩展名 = os.path.splitext(条目.name)
+                    if 扩展名.lower() not in self.有效扩展名集合: continue
+                    if self.搜索标记 and self.搜索标记 not in 文件基础名: continue
+                    if self.排除标记 and self.排除标记 in 文件基础名: continue
+                    if self._包含模式 and not _模式匹配(self._包含模式, 相对路径, 条目.name): continue
+                    if self._排除模式 and _模式匹配(self._排除模式, 相对路径, 条目.name): continue
+                    if 条目.path in self._文件信息:
+                        文件[条目.path] = (相对路径, None)
+                        continue
+                    try:
+                        if not 条目.is_file(): continue
+                        文件[条目.path] = (相对路径, 条目.stat().st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            return 目录, None, {}, []
+        return 目录, 目录修改时间, 文件, 子目录
+
+    def _移除目录(self, 目录: str, 已删除文件: List[str]) -> None:
+        self._目录修改时间.pop(目录, None)
+        self._目录根.pop(目录, None)
+        文件集合, 子目录集合 = self._目录内容.pop(目录, (frozenset(), frozenset()))
+        已删除文件.extend(文件集合)
+        for 子目录 in 子目录集合:
+            self._移除目录(子目录, 已删除文件)
+
+    def 刷新(self) -> str:
+        """所有已知目录都未变化时直接返回 "命中"，否则增量更新索引并返回 "刷新"。"""
+        with self._锁:
+            if not self._目录修改时间:
+                待扫描 = list(self.根目录列表)
+                for 根目录 in 待扫描:
+                    self._目录根[根目录] = 根目录
+            else:
+                待扫描 = []
+                for 目录, 旧修改时间 in self._目录修改时间.items():
+                    try:
+                        新修改时间 = os.stat(目录).st_mtime_ns
+                    except OSError:
+                        新修改时间 = None
+                    if 新修改时间 is None or 新修改时间 != 旧修改时间:
+                        待扫描.append(目录)
+                if not 待扫描:
+                    return "命中"
+
+            已删除: List[str] = []
+            新增: List[Tuple[str, str, float]] = []
+            现在 = time.time_ns()
+            线程池 = ThreadPoolExecutor(max_workers=_扫描最大线程数) if self.递归 or len(待扫描) > 1 else None
+            try:
+                while 待扫描:
+                    所属根目录 = [self._目录根[目录] for 目录 in 待扫描]
+                    扫描结果 = (线程池.map if 线程池 else map)(self._扫描目录, 待扫描, 所属根目录)
+                    下一层 = []
+                    for 目录, 目录修改时间, 文件, 子目录 in 扫描结果:
+                        if 目录 not in self._目录根:
+                            continue  # 上级目录在本轮中已被移除
+                        if 目录修改时间 is None:
+                            if 目录 in self.根目录列表:
+                                raise FileNotFoundError(f"根目录不可访问: {目录}")
+                            self._移除目录(目录, 已删除)
+                            continue
+                        旧文件, 旧子目录 = self._目录内容.get(目录, (frozenset(), frozenset()))
+                        已删除.extend(路径 for 路径 in 旧文件 if 路径 not in 文件)
+                        新增.extend((路径, 相对路径, 修改时间) for 路径, (相对路径, 修改时间) in 文件.items() if 修改时间 is not None)
+                        新子目录 = frozenset(子目录)
+                        for 旧目录 in 旧子目录 - 新子目录:
+                            self._移除目录(旧目录, 已删除)
+                        for 子目录路径 in 新子目录 - 旧子目录:
+                            self._目录根[子目录路径] = self._目录根[目录]
+                            下一层.append(子目录路径)
+                        self._目录内容[目录] = (frozenset(文件), 新子目录)
+                        # 刚刚变化过的目录下次仍需复查，避免同一时间片内的后续写入被漏掉
+                        self._目录修改时间[目录] = 目录修改时间 if 现在 - 目录修改时间 > _目录时间可信间隔_ns else None
+                    待扫描 = 下一层
+            finally:
+                if 线程池: 线程池.shutdown()
+
+            if len(已删除) + len(新增) > len(self._有序键) // 4:
+                # 变化量较大时整体重建比逐个二分插入更快
+                for 路径 in 已删除: self._文件信息.pop(路径, None)
+                self._文件信息.update((路径, (相对路径, 修改时间)) for 路径, 相对路径, 修改时间 in 新增)
+                self._有序键 = sorted(self._排序键(路径, 相对路径, 修改时间) for 路径, (相对路径, 修改时间) in self._文件信息.items())
+            else:
+                for 路径 in 已删除:
+                    if 路径 not in self._文件信息: continue
+                    键 = self._排序键(路径, *self._文件信息.pop(路径))
+                    位置 = bisect.bisect_left(self._有序键, 键)
+                    if 位置 < len(self._有序键) and self._有序键[位置] == 键:
+                        del self._有序键[位置]
+                for 路径, 相对路径, 修改时间 in 新增:
+                    self._文件信息[路径] = (相对路径, 修改时间)
+                    bisect.insort(self._有序键, self._排序键(路径, 相对路径, 修改时间))
+
+            if 已删除 or 新增 or self.版本 == 0:
+                self.版本 += 1
+            return "刷新"
+
+    def __len__(self) -> int:
+        return len(self._有序键)
+
+    def 快照(self) -> List[str]:
+        """按当前顺序返回所有文件的完整路径（只复制引用），供长时间遍历使用，不受之后刷新的影响。"""
+        with self._锁:
+            路径列表 = [键[-1] for 键 in self._有序键]
+        if self.降序:
+            路径列表.reverse()
+        return 路径列表
+
+    def __getitem__(self, 序号: int) -> Dict[str, Any]:
+        with self._锁:
+            if 序号 < 0 or 序号 >= len(self._有序键):
+                raise IndexError(序号)
+            键 = self._有序键[len(self._有序键) - 1 - 序号 if self.降序 else 序号]
+            完整路径 = 键[-1]
+            相对路径, 修改时间 = self._文件信息[完整路径]
+            return {"完整路径": 完整路径, "文件名": os.path.basename(完整路径), "修改时间": 修改时间, "相对路径": 相对路径}
+
+_索引缓存: "OrderedDict[tuple, _文件夹索引]" = OrderedDict()
+_索引缓存锁 = threading.Lock()
+_索引统计 = {"命中": 0, "未命中": 0, "刷新": 0}
+
+def _获取文件夹索引(根目录列表: Tuple[str, ...], 递归: bool, 有效扩展名集合: frozenset, 搜索标记: str, 排除标记: str,
+                 包含模式文本: str, 排除模式文本: str, 排序方式值: str) -> _文件夹索引:
+    键 = (tuple(os.path.normcase(os.path.abspath(根目录)) for 根目录 in 根目录列表), 递归, 有效扩展名集合,
+          搜索标记, 排除标记, 包含模式文本, 排除模式文本, 排序方式值)
+    with _索引缓存锁:
+        索引 = _索引缓存.get(键)
+        新建 = 索引 is None
+        if 新建:
+            索引 = _文件夹索引(根目录列表, 递归, 有效扩展名集合, 搜索标记, 排除标记, 包含模式文本, 排除模式文本, 排序方式值)
+            _索引缓存[键] = 索引
+            while len(_索引缓存) > _索引缓存上限:
+                _索引缓存.popitem(last=False)
+        else:
+            _索引缓存.move_to_end(键)
+    结果 = 索引.刷新()
+    if 新建:
+        _索引统计["未命中"] += 1
+    elif 结果 == "命中":
+        _索引统计["命中"] += 1
+    else:
+        _索引统计["刷新"] += 1
+    return 索引
+
+# --- 随机采样引擎 ---
+
+_采样策略选项 = ["洗牌 (不重复)", "按修改时间加权 (新文件优先)", "按子文件夹分层"]
+
+class _采样器:
+    """
+    基于某一版本文件索引的随机采样器，不触碰全局 random 状态。
+    固定种子时按种子预先生成一个不重复的排列，第 i 次抽取直接查表 (O(1))；
+    抽完一轮后以 (种子, 轮次) 生成下一轮排列。种子为 -1 时每次独立抽取 (O(log N))；
+    批量节点在种子为 -1 时改用 顺序抽取，沿本版本索引的一个会话排列依次取下一段，一轮内不重复。
+    - 洗牌: 均匀的无放回排列。
+    - 按修改时间加权: 权重为修改时间的名次 (越新越大)，用 Efraimidis-Spirakis 方法生成加权无放回排列。
+    - 按子文件夹分层: 各子文件夹内部洗牌后按比例交错，任意连续一段抽取中各文件夹的占比都接近其文件数占比。
+    """
+
+    _排列缓存上限 = 4
+
+    def __init__(self, 文件索引, 策略: str):
+        self.版本 = 文件索引.版本
+        self.策略 = 策略
+        self.数量 = len(文件索引)
+        条目列表 = [文件索引[i] for i in range(self.数量)]
+        self._权重: Optional[List[int]] = None
+        self._累计权重: Optional[List[int]] = None
+        self._分组: Optional[List[List[int]]] = None
+        if 策略 == _采样策略选项[1]:
+            按时间排序 = sorted(range(self.数量), key=lambda i: 条目列表[i]["修改时间"])
+            self._权重 = [0] * self.数量
+            for 名次, i in enumerate(按时间排序):
+                self._权重[i] = 名次 + 1
+            self._累计权重 = list(itertools.accumulate(self._权重))
+        elif 策略 == _采样策略选项[2]:
+            分组: Dict[str, List[int]] = {}
+            for i, 条目 in enumerate(条目列表):
+                分组.setdefault(os.path.dirname(条目["完整路径"]), []).append(i)
+            self._分组 = list(分组.values())
+        self._排列缓存: "OrderedDict[tuple, List[int]]" = OrderedDict()
+        self._会话种子 = random.SystemRandom().randrange(2 ** 32)
+        self._游标 = 0
+
+    def _生成排列(self, 随机数生成器: random.Random) -> List[int]:
+        if self._权重 is not None:
+            # log(u)/w 越大越靠前，等价于按 u^(1/w) 排序
+            键 = [math.log(1.0 - 随机数生成器.random()) / w for w in self._权重]
+            return sorted(range(self.数量), key=键.__getitem__, reverse=True)
+        if self._分组 is not None:
+            位置键: List[Tuple[float, int]] = []
+            for 组 in self._分组:
+                组 = 组[:]
+                随机数生成器.shuffle(组)
+                位置键.extend(((k + 随机数生成器.random()) / len(组), i) for k, i in enumerate(组))
+            位置键.sort()
+            return [i for _, i in 位置键]
+        排列 = list(range(self.数量))
+        随机数生成器.shuffle(排列)
+        return 排列
+
+    def _排列(self, 种子: int, 轮次: int) -> List[int]:
+        键 = (种子, 轮次)
+        排列 = self._排列缓存.get(键)
+        if 排列 is None:
+            排列 = self._生成排列(random.Random(f"{种子}:{轮次}"))
+            self._排列缓存[键] = 排列
+            while len(self._排列缓存) > self._排列缓存上限:
+                self._排列缓存.popitem(last=False)
+        return 排列
+
+    def 抽取(self, 第几次: int, 种子: int) -> int:
+        """返回第 第几次 次抽取对应的索引序号。"""
+        if 种子 >= 0:
+            轮次, 偏移 = divmod(第几次, self.数量)
+            return self._排列(种子, 轮次)[偏移]
+        随机数生成器 = random.Random()
+        if self._累计权重 is not None:
+            return bisect.bisect_right(self._累计权重, 随机数生成器.random() * self._累计权重[-1])
+        # 洗牌和分层策略的单次独立抽取都等价于均匀抽取（分层按文件数比例选文件夹，再在文件夹内均匀选取）
+        return 随机数生成器.randrange(self.数量)
+
+    def 顺序抽取(self, 数量: int) -> List[int]:
+        """从会话排列的游标处取下 数量 个索引序号，每次调用都接着上一次的位置。"""
+        结果 = [self.抽取(self._游标 + j, self._会话种子) for j in range(数量)]
+        self._游标 += 数量
+        return 结果
+
+def _获取采样器(文件索引, 策略: str) -> _采样器:
+    采样器 = 文件索引.采样器缓存.get(策略)
+    if 采样器 is None or 采样器.版本 != 文件索引.版本 or 采样器.数量 != len(文件索引):
+        采样器 = _采样器(文件索引, 策略)
+        文件索引.采样器缓存[策略] = 采样器
+    return 采样器
+
+# --- 解码图像缓存 ---
+
+class _解码图像缓存:
+    """
+    进程级 LRU 缓存，保存解码后的 uint8 图像和元数据，键为 (路径, mtime_ns, 文件大小, 解码模式)。
+    缓存总字节数超过上限时淘汰最久未使用的条目；上限为 0 时不缓存。浮点转换在输出时才进行。
+    """
+
+    def __init__(self, 上限字节: int):
+        self.上限字节 = 上限字节
+        self._条目: "OrderedDict[tuple, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._当前字节 = 0
+        self._锁 = threading.Lock()
+        self.命中 = 0
+        self.未命中 = 0
+        self.淘汰 = 0
+
+    def _淘汰至(self, 上限字节: int) -> None:
+        while self._条目 and self._当前字节 > 上限字节:
+            _, (图像_u8, _) = self._条目.popitem(last=False)
+            self._当前字节 -= 图像_u8.nbytes
+            self.淘汰 += 1
+
+    def 设置上限(self, 上限字节: int) -> None:
+        with self._锁:
+            self.上限字节 = 上限字节
+            self._淘汰至(上限字节)
+
+    def 包含(self, 键: tuple) -> bool:
+        with self._锁:
+            return 键 in self._条目
+
+    def 获取(self, 键: tuple) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        with self._锁:
+            值 = self._条目.get(键)
+            if 值 is None:
+                self.未命中 += 1
+                return None
+            self._条目.move_to_end(键)
+            self.命中 += 1
+            return 值
+
+    def 放入(self, 键: tuple, 图像_u8: np.ndarray, 元数据: Dict[str, Any]) -> bool:
+        """返回条目是否已在缓存中（缓存关闭或图像超过上限时为 False）。"""
+        with self._锁:
+            if 键 in self._条目:
+                return True
+            if 图像_u8.nbytes > self.上限字节:
+                return False
+            图像_u8.flags.writeable = False  # 缓存中的数组被多次复用，禁止原地修改
+            self._条目[键] = (图像_u8, 元数据)
+            self._当前字节 += 图像_u8.nbytes
+            self._淘汰至(self.上限字节)
+            return True
+
+    def 统计文本(self) -> str:
+        if self.上限字节 <= 0:
+            return ""
+        return (f"(解码缓存 命中 {self.命中} / 未命中 {self.未命中} / 淘汰 {self.淘汰}, "
+                f"占用 {self._当前字节 / (1024 * 1024):.1f}/{self.上限字节 / (1024 * 1024):.0f} MB)")
+
+# 默认关闭，需要时在节点的 解码缓存上限MB 输入中开启（例如 512），避免未使用缓存的工作流额外占用内存
+_默认解码缓存上限MB = 0
+_解码缓存 = _解码图像缓存(_默认解码缓存上限MB * 1024 * 1024)
+
+# --- 后台预取 ---
+
+# 预取线程池在首次需要时创建；_预取中 记录正在解码的缓存键，主线程遇到同一文件时等待结果而不是重复解码。
+# 解码缓存关闭（默认）或放不下时，预取结果暂存在 _预取缓冲 中，最多保留 预取数量 张，被读取一次后即释放
+_预取最大线程数 = 4
+_预取线程池: Optional[ThreadPoolExecutor] = None
+_预取中: Dict[tuple, Future] = {}
+_预取缓冲: "OrderedDict[tuple, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+_预取缓冲上限 = 0
+_预取锁 = threading.Lock()
+_预取统计 = {"提交": 0, "等待": 0}
+
+def _获取预取线程池() -> ThreadPoolExecutor:
+    global _预取线程池
+    with _预取锁:
+        if _预取线程池 is None:
+            _预取线程池 = ThreadPoolExecutor(max_workers=_预取最大线程数, thread_name_prefix="AutoData预取")
+        return _预取线程池
+
 # --- 主节点类 ---
 
 class 按序号加载标记图像_V5:
@@ -42,30 +465,75 @@ class 按序号加载标记图像_V5:
                 "搜索标记": ("STRING", {"default": "", "multiline": False}),
                 "排除标记": ("STRING", {"default": "", "multiline": False}),
                 "从名称中移除搜索标记": ("BOOLEAN", {"default": True, "label_on": "是", "label_off": "否"}),
+            },
+            "optional": {
+                # 进程级解码缓存的上限，0 为关闭（默认）；需要重复读取同一批图像时再开启
+                "解码缓存上限MB": ("INT", {"default": _默认解码缓存上限MB, "min": 0, "max": 65536, "step": 64}),
+                # 顺序模式下在后台预先解码后续 N 张图像（写入解码缓存；缓存关闭时暂存在最多 N 张的预取缓冲中），0 为关闭
+                "预取数量": ("INT", {"default": 0, "min": 0, "max": 32, "step": 1}),
+                # 随机抽取模式下的采样方式；固定种子时 序号 表示第几次抽取，循环中不会重复
+                "采样策略": (_采样策略选项, {"default": _采样策略选项[0]}),
+                # 递归扫描子文件夹；文件夹路径可用分号或换行分隔多个根目录
+                "递归扫描": ("BOOLEAN", {"default": False, "label_on": "是", "label_off": "否"}),
+                # 分号分隔的 glob（如 *.png;subset_*/**）或以 re: 开头的正则；排除模式同时用于跳过子文件夹
+                "包含模式": ("STRING", {"default": "", "multiline": False}),
+                "排除模式": ("STRING", {"default": "", "multiline": False}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "INT", "STRING")
-    RETURN_NAMES = ("图像", "文件名", "元数据 (JSON)", "文件总数", "状态信息")
+    # 完整路径放在最后，不影响已有工作流的连线；可直接接到 A1111 元数据节点，跳过 JSON 序列化
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "INT", "STRING", "STRING")
+    RETURN_NAMES = ("图像", "文件名", "元数据 (JSON)", "文件总数", "状态信息", "完整路径")
     FUNCTION = "加载图像"
     CATEGORY = "自动数据"
     
-    def IS_CHANGED(self, **kwargs):
-        # 强制每次都运行，确保文件列表是最新的
-        return time.time()
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # 随机模式且未固定种子时每次都重新执行
+        if kwargs.get("排序方式") == cls.排序选项标签[-1] and kwargs.get("随机种子", -1) < 0:
+            return float("nan")
+        # 其余情况先对索引做一次增量刷新（只 stat 已知目录，包括子文件夹，并遵守 2 秒的粗粒度时间保护），
+        # 再取本次会选中的文件的 (mtime_ns, 大小)：文件增删会改变索引版本，原地覆盖会改变文件的 mtime/大小
+        try:
+            节点 = cls()
+            文件索引, 状态消息 = 节点._筛选并排序文件(
+                kwargs.get("文件夹路径"), kwargs.get("搜索标记"), kwargs.get("排除标记"), kwargs.get("排序方式"),
+                kwargs.get("文件扩展名"), kwargs.get("递归扫描", False), kwargs.get("包含模式", ""), kwargs.get("排除模式", ""))
+            if not len(文件索引):
+                # 文件夹不存在或为空时不能返回固定值，否则之后出现文件也会沿用缓存的错误结果
+                return float("nan")
+            变化键 = [str(id(文件索引)), str(文件索引.版本)]
+            for 序号 in 节点._预计选中序号(文件索引, kwargs):
+                文件状态 = os.stat(文件索引[序号]["完整路径"])
+                变化键.append(f"{文件状态.st_mtime_ns}:{文件状态.st_size}")
+            return "_".join(变化键)
+        except (OSError, IndexError):
+            return float("nan")
+
+    def _预计选中序号(self, 文件索引, kwargs) -> List[int]:
+        """IS_CHANGED 使用：不打印日志地算出本次执行会读取的序号（随机模式只在种子固定时调用）。"""
+        序号 = kwargs.get("序号", 0)
+        if kwargs.get("排序方式") == self.排序选项标签[-1]:
+            return [_获取采样器(文件索引, kwargs.get("采样策略", _采样策略选项[0])).抽取(序号, kwargs.get("随机种子", 0))]
+        return [序号] if 0 <= 序号 < len(文件索引) else []
 
     def _创建占位图像(self, 宽度: int = 64, 高度: int = 64) -> torch.Tensor:
-        pil_图像 = Image.new('RGBA', (宽度, 高度), (0, 0, 0, 255))
-        图像_np = np.array(pil_图像).astype(np.float32) / 255.0
-        张量 = torch.from_numpy(图像_np).unsqueeze(0)
-        pil_图像.close()
+        # 黑色不透明 RGBA，与 Image.new('RGBA', ..., (0, 0, 0, 255)) 转换后的结果相同
+        张量 = torch.zeros((1, 高度, 宽度, 4), dtype=torch.float32)
+        张量[..., 3] = 1.0
         return 张量
 
-    def _筛选并排序文件(self, 文件夹路径: str, 搜索标记: str, 排除标记: str, 排序方式标签: str, 扩展名字符串: str) -> Tuple[List[Dict[str, Any]], str]:
-        if not 文件夹路径 or not os.path.isdir(文件夹路径):
+    def _筛选并排序文件(self, 文件夹路径: str, 搜索标记: str, 排除标记: str, 排序方式标签: str, 扩展名字符串: str,
+                     递归扫描: bool = False, 包含模式: str = "", 排除模式: str = "") -> Tuple[Any, str]:
+        """
+        返回已排序的文件索引（支持 len() 与按序号取值）和状态消息。索引按文件夹缓存并增量刷新。
+        文件夹路径可用分号或换行分隔多个根目录。
+        """
+        根目录列表 = tuple(dict.fromkeys(_拆分列表(文件夹路径)))
+        if not 根目录列表 or not all(os.path.isdir(根目录) for 根目录 in 根目录列表):
             return [], "错误: 文件夹路径无效或未指定。"
         
-        有效扩展名集合 = {f".{ext.strip().lower()}" for ext in 扩展名字符串.split(',') if ext.strip()}
+        有效扩展名集合 = frozenset(f".{ext.strip().lower()}" for ext in 扩展名字符串.split(',') if ext.strip())
         if not 有效扩展名集合:
             return [], "错误: 未提供有效的文件扩展名。"
 
@@ -75,38 +543,191 @@ class 按序号加载标记图像_V5:
             排序方式值 = self.排序选项值[0]
             print(f"[{self.节点名称}] 警告: 无效排序标签, 使用默认 '{排序方式值}'")
 
-        候选文件信息列表 = []
-        for 文件名_带扩展名 in os.listdir(文件夹路径):
-            文件基础名, 扩展名 = os.path.splitext(文件名_带扩展名)
-            
-            if 扩展名.lower() not in 有效扩展名集合: continue
-            if 搜索标记 and 搜索标记 not in 文件基础名: continue 
-            if 排除标记 and 排除标记 in 文件基础名: continue 
-            
-            完整路径 = os.path.join(文件夹路径, 文件名_带扩展名)
-            if not os.path.isfile(完整路径): continue
+        # 随机模式在主函数中抽取，底层按文件名升序建立索引
+        if 排序方式值 == "随机":
+            排序方式值 = self.排序选项值[0]
 
-            try: 修改时间 = os.path.getmtime(完整路径)
-            except OSError: 修改时间 = 0
+        try:
+            文件索引 = _获取文件夹索引(根目录列表, bool(递归扫描), 有效扩展名集合, 搜索标记 or "", 排除标记 or "",
+                                 包含模式 or "", 排除模式 or "", 排序方式值)
+        except OSError as e:
+            return [], f"错误: 扫描文件夹失败: {e}"
 
-            候选文件信息列表.append({"完整路径": 完整路径, "文件名": 文件名_带扩展名, "修改时间": 修改时间})
-        
-        if not 候选文件信息列表:
-            return [], "状态: 未找到符合所有条件的文件。"
-
-        # [修改] 排序逻辑现在跳过随机选项，因为随机选择将在主函数中处理
-        if "文件名" in 排序方式值:
-            候选文件信息列表.sort(key=lambda x: _自然排序键(x["文件名"]), reverse=("降序" in 排序方式值))
-        elif "修改时间" in 排序方式值:
-            候选文件信息列表.sort(key=lambda x: x["修改时间"], reverse=("降序" in 排序方式值))
-            
-        return 候选文件信息列表, f"状态: 找到 {len(候选文件信息列表)} 个文件。"
+        索引统计 = f"(索引 命中 {_索引统计['命中']} / 未命中 {_索引统计['未命中']} / 增量刷新 {_索引统计['刷新']})"
+        if not len(文件索引):
+            return [], f"状态: 未找到符合所有条件的文件。{索引统计}"
+        return 文件索引, f"状态: 找到 {len(文件索引)} 个文件。{索引统计}"
 
     def _格式化文件大小(self, size_bytes: int) -> str:
         if size_bytes > 1024 * 1024: return f"{size_bytes / (1024 * 1024):.2f} MB"
         if size_bytes > 1024: return f"{size_bytes / 1024:.2f} KB"
         return f"{size_bytes} B"
 
+    def _确定最终序号(self, 文件索引, 序号: int, 排序方式: str, 随机种子: int, 采样策略: str) -> Tuple[int, bool]:
+        """随机模式下把 序号 视为第几次抽取，由采样器给出实际序号；否则原样返回。返回 (最终序号, 是否随机模式)。"""
+        最终序号 = 序号
+        是随机模式 = (排序方式 == self.排序选项标签[-1]) # 检查是否选择了最后一个选项 "随机抽取"
+
+        if 是随机模式 and len(文件索引) > 0:
+            print(f"[{self.节点名称}] 进入随机抽取模式 ({采样策略})...")
+            if 随机种子 >= 0:
+                print(f"[{self.节点名称}] 使用固定随机种子: {随机种子}，第 {序号} 次抽取。")
+            else:
+                # 种子为-1时，每次独立随机抽取
+                print(f"[{self.节点名称}] 使用系统随机源。")
+            最终序号 = _获取采样器(文件索引, 采样策略).抽取(序号, 随机种子)
+            print(f"[{self.节点名称}] 随机抽中的序号为: {最终序号}")
+        return 最终序号, 是随机模式
+
+    def _构建文件信息(self, 完整路径: str, 宽度: Optional[int], 高度: Optional[int]) -> Dict[str, str]:
+        文件状态 = os.stat(完整路径)
+        return {
+            "filename": 完整路径,
+            "resolution": f"{宽度}x{高度}" if 宽度 and 高度 else "",
+            "date": datetime.datetime.fromtimestamp(文件状态.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+            "size": self._格式化文件大小(文件状态.st_size)
+        }
+
+    def _读取头部元数据(self, 完整路径: str) -> Dict[str, Any]:
+        头部 = 读取图像头部元数据(完整路径)
+        fileinfo = self._构建文件信息(完整路径, 头部["宽度"], 头部["高度"])
+        return {"fileinfo": fileinfo, "parameters": 提取嵌入参数(头部["文本"])}
+
+    def _解码图像(self, 完整路径: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """解码单张图像（优先取自解码缓存），返回只读的 uint8 HxWxC 数组（RGB 或 RGBA）和元数据字典。"""
+        文件状态 = os.stat(完整路径)
+        键 = (完整路径, 文件状态.st_mtime_ns, 文件状态.st_size, "auto")
+        缓存值 = _解码缓存.获取(键)
+        if 缓存值 is not None:
+            return 缓存值
+        with _预取锁:
+            缓冲值 = _预取缓冲.pop(键, None)
+            预取任务 = _预取中.get(键)
+        if 缓冲值 is not None:
+            return 缓冲值
+        if 预取任务 is not None:
+            _预取统计["等待"] += 1
+            try:
+                return 预取任务.result()
+            except Exception:
+                pass  # 预取失败时在当前线程重新解码，以便报告真实错误
+        图像_u8, 元数据 = self._解码图像文件(完整路径)
+        _解码缓存.放入(键, 图像_u8, 元数据)
+        return 图像_u8, 元数据
+
+    def _预取解码(self, 键: tuple, 完整路径: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+        try:
+            图像_u8, 元数据 = self._解码图像文件(完整路径)
+            if not _解码缓存.放入(键, 图像_u8, 元数据):
+                with _预取锁:
+                    _预取缓冲[键] = (图像_u8, 元数据)
+                    while len(_预取缓冲) > _预取缓冲上限:
+                        _预取缓冲.popitem(last=False)
+            return 图像_u8, 元数据
+        finally:
+            with _预取锁:
+                _预取中.pop(键, None)
+
+    def _预取后续图像(self, 文件索引, 起始序号: int, 数量: int) -> int:
+        """在后台线程中解码 [起始序号, 起始序号 + 数量) 范围内尚未缓存的图像，返回新提交的任务数。"""
+        global _预取缓冲上限
+        with _预取锁:
+            _预取缓冲上限 = max(数量, 0)
+            while len(_预取缓冲) > _预取缓冲上限:
+                _预取缓冲.popitem(last=False)
+        if 数量 <= 0:
+            return 0
+        线程池 = _获取预取线程池()
+        已提交 = 0
+        for 序号 in range(max(起始序号, 0), min(起始序号 + 数量, len(文件索引))):
+            完整路径 = 文件索引[序号]["完整路径"]
+            try:
+                文件状态 = os.stat(完整路径)
+            except OSError:
+                continue
+            键 = (完整路径, 文件状态.st_mtime_ns, 文件状态.st_size, "auto")
+            if _解码缓存.包含(键):
+                continue
+            with _预取锁:
+                if 键 in _预取中 or 键 in _预取缓冲 or len(_预取中) >= 数量:
+                    continue
+                # 在持锁状态下登记，保证任务结束时的 pop 一定发生在登记之后
+                _预取中[键] = 线程池.submit(self._预取解码, 键, 完整路径)
+            已提交 += 1
+        _预取统计["提交"] += 已提交
+        return 已提交
+
+    @staticmethod
+    def _提取PIL文本(pil_图像: Image.Image) -> Dict[str, str]:
+        """
+        收集 PIL 读到的文本块，并用与头部读取器相同的方式解码 EXIF UserComment、补上 JPEG/WebP 的 XMP 包，
+        保证两条路径取到相同的参数。
+        注意：早期版本只读取 parameters/prompt，没有这两项回退的 JPEG/WebP 输出的 parameters 为空。
+        """
+        文本 = {键: 值 for 键, 值 in pil_图像.info.items() if isinstance(值, str)}
+        exif数据 = pil_图像.info.get("exif")
+        if isinstance(exif数据, bytes):
+            try:
+                用户注释, _ = 解析EXIF(exif数据)
+            except struct.error:
+                用户注释 = None
+            if 用户注释:
+                文本.setdefault("UserComment", 用户注释)
+        xmp数据 = pil_图像.info.get("xmp")
+        if isinstance(xmp数据, bytes):
+            文本.setdefault("XML:com.adobe.xmp", xmp数据.decode("utf-8", errors="replace"))
+        return 文本
+
+    def _解码图像文件(self, 完整路径: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """从磁盘解码单张图像，返回 uint8 的 HxWxC 数组（RGB 或 RGBA）和元数据字典。"""
+        pil_图像 = None
+        try:
+            with Image.open(完整路径) as 原始图像:
+                文本 = self._提取PIL文本(原始图像)
+                pil_图像 = ImageOps.exif_transpose(原始图像)
+
+            fileinfo = self._构建文件信息(完整路径, pil_图像.width, pil_图像.height)
+            full_metadata = {"fileinfo": fileinfo, "parameters": 提取嵌入参数(文本)}
+
+            if pil_图像.mode == 'RGBA' or 'A' in pil_图像.getbands():
+                pil_图像 = pil_图像.convert('RGBA')
+            elif pil_图像.mode in ('L', '1'):
+                # 灰度图保持单通道（缓存只占 1/3），输出时再扩展为 RGB
+                pil_图像 = pil_图像.convert('L')
+            else:
+                pil_图像 = pil_图像.convert('RGB')
+
+            # np.asarray 直接包装 PIL 导出的缓冲区，不再额外复制
+            图像_u8 = np.asarray(pil_图像)
+            if 图像_u8.ndim == 2: 图像_u8 = 图像_u8[:, :, np.newaxis]
+            return 图像_u8, full_metadata
+        finally:
+            if pil_图像: pil_图像.close()
+
+    def _写入图像张量(self, 目标: torch.Tensor, 图像_u8: np.ndarray) -> None:
+        """
+        把 uint8 的 HxWxC 图像就地写入 float32 目标张量 (HxWxC')：单通道扩展为 RGB，
+        目标比来源多出的 alpha 通道补 1。整个过程只写目标张量，不产生临时的整幅浮点数组。
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # 缓存中的数组是只读的，这里只作为 copy_ 的来源
+            源 = torch.from_numpy(图像_u8)
+        if 源.shape[2] == 1:
+            源 = 源.expand(-1, -1, 3)
+        颜色通道 = min(源.shape[2], 目标.shape[2])
+        颜色部分 = 目标[..., :颜色通道]
+        颜色部分.copy_(源[..., :颜色通道])
+        颜色部分.div_(255.0)
+        if 目标.shape[2] > 颜色通道:
+            目标[..., 颜色通道:].fill_(1.0)
+
+    def _转为图像张量(self, 图像_u8: np.ndarray) -> torch.Tensor:
+        """uint8 的 HxWxC 数组转为 ComfyUI 的 float32 IMAGE 张量 (1xHxWxC, 0-1)，只分配输出张量本身。"""
+        高度, 宽度, 通道数 = 图像_u8.shape
+        输出 = torch.empty((1, 高度, 宽度, max(通道数, 3)), dtype=torch.float32)
+        self._写入图像张量(输出[0], 图像_u8)
+        return 输出
+
     def 加载图像(self, **kwargs):
         文件夹路径 = kwargs.get("文件夹路径")
         序号 = kwargs.get("序号")
@@ -116,38 +737,24 @@ class 按序号加载标记图像_V5:
         搜索标记 = kwargs.get("搜索标记")
         排除标记 = kwargs.get("排除标记")
         从名称中移除搜索标记 = kwargs.get("从名称中移除搜索标记")
+        _解码缓存.设置上限(kwargs.get("解码缓存上限MB", _默认解码缓存上限MB) * 1024 * 1024)
 
         print(f"\n[{self.节点名称}] 节点开始实时执行...")
         
-        已排序文件列表, 状态消息 = self._筛选并排序文件(文件夹路径, 搜索标记, 排除标记, 排序方式, 文件扩展名)
+        已排序文件列表, 状态消息 = self._筛选并排序文件(文件夹路径, 搜索标记, 排除标记, 排序方式, 文件扩展名,
+                                               kwargs.get("递归扫描", False), kwargs.get("包含模式", ""), kwargs.get("排除模式", ""))
         文件总数 = len(已排序文件列表)
         print(f"[{self.节点名称}] {状态消息}")
 
         if "错误:" in 状态消息 or not 已排序文件列表:
-            return (self._创建占位图像(), "", "", 0, 状态消息)
-
-        # --- [新增] 随机选择逻辑 ---
-        最终序号 = 序号
-        是随机模式 = (排序方式 == self.排序选项标签[-1]) # 检查是否选择了最后一个选项 "随机抽取"
+            return (self._创建占位图像(), "", "", 0, 状态消息, "")
 
-        if 是随机模式:
-            print(f"[{self.节点名称}] 进入随机抽取模式...")
-            if 文件总数 > 0:
-                if 随机种子 >= 0:
-                    random.seed(随机种子)
-                    print(f"[{self.节点名称}] 使用固定随机种子: {随机种子}")
-                else:
-                    # 种子为-1时，不设置seed，让其自然随机
-                    print(f"[{self.节点名称}] 使用系统时间作为随机种子。")
-                
-                最终序号 = random.randint(0, 文件总数 - 1)
-                print(f"[{self.节点名称}] 随机抽中的序号为: {最终序号}")
-        # --- 随机选择逻辑结束 ---
+        最终序号, 是随机模式 = self._确定最终序号(已排序文件列表, 序号, 排序方式, 随机种子, kwargs.get("采样策略", _采样策略选项[0]))
 
         if not (0 <= 最终序号 < 文件总数):
             错误消息 = f"错误: 最终序号 {最终序号} 超出范围 (0 到 {文件总数 - 1})。"
             print(f"[{self.节点名称}] {错误消息}")
-            return (self._创建占位图像(), "", "", 文件总数, 错误消息)
+            return (self._创建占位图像(), "", "", 文件总数, 错误消息, "")
 
         选中的文件信息 = 已排序文件列表[最终序号]
         待加载的完整路径 = 选中的文件信息["完整路径"]
@@ -156,54 +763,348 @@ class 按序号加载标记图像_V5:
         if 从名称中移除搜索标记 and 搜索标记:
             待返回的文件名 = 待返回的文件名.replace(搜索标记, "")
         
-        pil_图像 = None
         try:
             print(f"[{self.节点名称}] 正在加载序号 {最终序号}: '{待加载的完整路径}'")
-            pil_图像 = Image.open(待加载的完整路径)
-            pil_图像 = ImageOps.exif_transpose(pil_图像)
-
-            fileinfo = {
-                "filename": 待加载的完整路径,
-                "resolution": f"{pil_图像.width}x{pil_图像.height}",
-                "date": datetime.datetime.fromtimestamp(os.path.getmtime(待加载的完整路径)).strftime("%Y-%m-%d %H:%M:%S"),
-                "size": self._格式化文件大小(os.path.getsize(待加载的完整路径))
-            }
-
-            embedded_params = pil_图像.info.get('parameters', pil_图像.info.get('prompt', ''))
-            full_metadata = {"fileinfo": fileinfo, "parameters": embedded_params}
+            图像_u8, full_metadata = self._解码图像(待加载的完整路径)
             metadata_json_str = json.dumps(full_metadata, ensure_ascii=False, indent=4)
-            
-            if pil_图像.mode == 'RGBA' or 'A' in pil_图像.getbands():
-                pil_图像 = pil_图像.convert('RGBA')
-            else:
-                pil_图像 = pil_图像.convert('RGB')
+            图像张量 = self._转为图像张量(图像_u8)
 
-            图像_np = np.array(pil_图像).astype(np.float32) / 255.0
-            if 图像_np.ndim == 2: 图像_np = np.expand_dims(图像_np, axis=2)
-            if 图像_np.shape[2] == 1: 图像_np = 图像_np.repeat(3, axis=2)
-            图像张量 = torch.from_numpy(图像_np).unsqueeze(0)
+            # 顺序模式下后续序号可预测，趁下游节点运行时在后台解码
+            预取数量 = 0 if 是随机模式 else kwargs.get("预取数量", 0)
+            已预取 = self._预取后续图像(已排序文件列表, 最终序号 + 1, 预取数量)
             
             模式字符串 = "随机" if 是随机模式 else ""
-            成功消息 = f"成功{模式字符串}加载序号 {最终序号}: '{待返回的文件名}' (共 {文件总数} 个)。"
+            成功消息 = f"成功{模式字符串}加载序号 {最终序号}: '{待返回的文件名}' (共 {文件总数} 个)。{_解码缓存.统计文本()}"
+            if 预取数量: 成功消息 += f" 后台预取 {已预取} 张。"
             print(f"[{self.节点名称}] {成功消息}")
             
-            return (图像张量, 待返回的文件名, metadata_json_str, 文件总数, 成功消息)
+            return (图像张量, 待返回的文件名, metadata_json_str, 文件总数, 成功消息, 待加载的完整路径)
             
         except Exception as e:
             错误消息 = f"错误: 加载图像 '{待加载的完整路径}' 失败: {e}"
             print(f"[{self.节点名称}] {错误消息}")
-            return (self._创建占位图像(), 待返回的文件名, "", 文件总数, 错误消息)
+            return (self._创建占位图像(), 待返回的文件名, "", 文件总数, 错误消息, 待加载的完整路径)
         
         finally:
-            if pil_图像: pil_图像.close()
-            if '图像_np' in locals(): del 图像_np
+            if '图像_u8' in locals(): del 图像_u8
             if '已排序文件列表' in locals(): del 已排序文件列表
             if '选中的文件信息' in locals(): del 选中的文件信息
 
+
+class 按序号批量加载标记图像_V5(按序号加载标记图像_V5):
+    """
+    按序号批量加载标记图像 - 一次加载从 序号 开始的连续 批量大小 张图像（随机模式下为随机抽取），
+    用线程池并行解码，输出一个图像批次、文件名列表（换行分隔）和元数据列表 (JSON 数组)。
+    批次内尺寸不一致时按 尺寸对齐方式 处理。
+    """
+
+    对齐选项 = ["填充 (对齐到最大尺寸)", "缩放 (对齐到首张尺寸)", "分桶 (仅保留与首张同尺寸)"]
+    节点名称 = "按序号批量加载标记图像_V5"
+
+    def _预计选中序号(self, 文件索引, kwargs) -> List[int]:
+        序号, 批量大小 = kwargs.get("序号", 0), kwargs.get("批量大小", 4)
+        数量 = min(批量大小, len(文件索引))
+        if kwargs.get("排序方式") == self.排序选项标签[-1]:
+            采样器 = _获取采样器(文件索引, kwargs.get("采样策略", _采样策略选项[0]))
+            return [采样器.抽取(序号 * 批量大小 + j, kwargs.get("随机种子", 0)) for j in range(数量)]
+        return list(range(序号, min(序号 + 批量大小, len(文件索引))))
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        输入 = super().INPUT_TYPES()
+        输入["required"].update({
+            "批量大小": ("INT", {"default": 4, "min": 1, "max": 4096, "step": 1}),
+            "尺寸对齐方式": (cls.对齐选项, {"default": cls.对齐选项[0]}),
+            "解码线程数": ("INT", {"default": 4, "min": 1, "max": 32, "step": 1}),
+        })
+        return 输入
+
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "INT", "STRING", "STRING")
+    RETURN_NAMES = ("图像批次", "文件名列表", "元数据列表 (JSON)", "文件总数", "状态信息", "完整路径列表")
+    FUNCTION = "批量加载图像"
+
+    def _对齐并堆叠(self, 图像列表: List[np.ndarray], 对齐方式: str) -> Tuple[List[int], torch.Tensor]:
+        """按对齐方式统一尺寸和通道数，返回保留下来的下标和 float32 的 BxHxWxC 图像批次。"""
+        首张高, 首张宽 = 图像列表[0].shape[:2]
+
+        if 对齐方式 == self.对齐选项[2]:
+            保留下标 = [i for i, 图像 in enumerate(图像列表) if 图像.shape[:2] == (首张高, 首张宽)]
+            高度, 宽度 = 首张高, 首张宽
+        elif 对齐方式 == self.对齐选项[1]:
+            保留下标 = list(range(len(图像列表)))
+            高度, 宽度 = 首张高, 首张宽
+        else:
+            保留下标 = list(range(len(图像列表)))
+            高度 = max(图像.shape[0] for 图像 in 图像列表)
+            宽度 = max(图像.shape[1] for 图像 in 图像列表)
+
+        通道数 = max(max(图像列表[i].shape[2], 3) for i in 保留下标)
+        # 一次性分配整个批次，逐张就地写入；填充区域为黑色（有 alpha 时不透明）
+        批次 = torch.zeros((len(保留下标), 高度, 宽度, 通道数), dtype=torch.float32)
+        if 通道数 == 4:
+            批次[..., 3] = 1.0
+        for 目标位置, i in enumerate(保留下标):
+            图像 = 图像列表[i]
+            if 对齐方式 == self.对齐选项[1] and 图像.shape[:2] != (高度, 宽度):
+                with Image.fromarray(图像[:, :, 0] if 图像.shape[2] == 1 else 图像) as pil_图像:
+                    图像 = np.asarray(pil_图像.resize((宽度, 高度), Image.LANCZOS))
+                if 图像.ndim == 2: 图像 = 图像[:, :, np.newaxis]
+            h, w = 图像.shape[:2]
+            self._写入图像张量(批次[目标位置, :h, :w], 图像)
+        return 保留下标, 批次
+
+    def 批量加载图像(self, **kwargs):
+        文件夹路径 = kwargs.get("文件夹路径")
+        序号 = kwargs.get("序号")
+        排序方式 = kwargs.get("排序方式")
+        随机种子 = kwargs.get("随机种子")
+        文件扩展名 = kwargs.get("文件扩展名")
+        搜索标记 = kwargs.get("搜索标记")
+        排除标记 = kwargs.get("排除标记")
+        从名称中移除搜索标记 = kwargs.get("从名称中移除搜索标记")
+        批量大小 = kwargs.get("批量大小", 4)
+        尺寸对齐方式 = kwargs.get("尺寸对齐方式", self.对齐选项[0])
+        解码线程数 = kwargs.get("解码线程数", 4)
+        _解码缓存.设置上限(kwargs.get("解码缓存上限MB", _默认解码缓存上限MB) * 1024 * 1024)
+
+        print(f"\n[{self.节点名称}] 节点开始实时执行...")
+
+        已排序文件列表, 状态消息 = self._筛选并排序文件(文件夹路径, 搜索标记, 排除标记, 排序方式, 文件扩展名,
+                                               kwargs.get("递归扫描", False), kwargs.get("包含模式", ""), kwargs.get("排除模式", ""))
+        文件总数 = len(已排序文件列表)
+        print(f"[{self.节点名称}] {状态消息}")
+
+        if "错误:" in 状态消息 or not 已排序文件列表:
+            return (self._创建占位图像(), "", "[]", 0, 状态消息, "")
+
+        是随机模式 = (排序方式 == self.排序选项标签[-1])
+        if 是随机模式:
+            # 固定种子时第 序号 个批次对应第 序号*批量大小 起的连续抽取；
+            # 种子为 -1 时每次接着上一批次在同一个会话排列中继续抽取，索引不变时一轮内的各批次互不重复
+            采样器 = _获取采样器(已排序文件列表, kwargs.get("采样策略", _采样策略选项[0]))
+            if 随机种子 >= 0:
+                选中序号列表 = [采样器.抽取(序号 * 批量大小 + j, 随机种子) for j in range(min(批量大小, 文件总数))]
+            else:
+                选中序号列表 = 采样器.顺序抽取(min(批量大小, 文件总数))
+        else:
+            if not (0 <= 序号 < 文件总数):
+                错误消息 = f"错误: 起始序号 {序号} 超出范围 (0 到 {文件总数 - 1})。"
+                print(f"[{self.节点名称}] {错误消息}")
+                return (self._创建占位图像(), "", "[]", 文件总数, 错误消息, "")
+            选中序号列表 = list(range(序号, min(序号 + 批量大小, 文件总数)))
+
+        选中文件 = [已排序文件列表[i] for i in 选中序号列表]
+
+        def _解码(文件信息):
+            try:
+                return self._解码图像(文件信息["完整路径"])
+            except Exception as e:
+                print(f"[{self.节点名称}] 警告: 加载图像 '{文件信息['完整路径']}' 失败: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(解码线程数, len(选中文件)))) as 线程池:
+            解码结果 = list(线程池.map(_解码, 选中文件))
+
+        成功列表 = [(文件信息, 结果) for 文件信息, 结果 in zip(选中文件, 解码结果) if 结果 is not None]
+        失败数量 = len(选中文件) - len(成功列表)
+        if not 成功列表:
+            错误消息 = f"错误: 批次中的 {len(选中文件)} 张图像全部加载失败。"
+            print(f"[{self.节点名称}] {错误消息}")
+            return (self._创建占位图像(), "", "[]", 文件总数, 错误消息, "")
+
+        保留下标, 图像批次 = self._对齐并堆叠([结果[0] for _, 结果 in 成功列表], 尺寸对齐方式)
+        丢弃数量 = len(成功列表) - len(保留下标)
+
+        文件名列表 = []
+        完整路径列表 = []
+        元数据列表 = []
+        for i in 保留下标:
+            文件信息, (_, 元数据) = 成功列表[i]
+            文件名 = 文件信息["文件名"]
+            if 从名称中移除搜索标记 and 搜索标记:
+                文件名 = 文件名.replace(搜索标记, "")
+            文件名列表.append(文件名)
+            完整路径列表.append(文件信息["完整路径"])
+            元数据列表.append(元数据)
+
+        预取数量 = 0 if 是随机模式 else kwargs.get("预取数量", 0)
+        已预取 = self._预取后续图像(已排序文件列表, 选中序号列表[-1] + 1, 预取数量)
+        模式字符串 = "随机" if 是随机模式 else ""
+        成功消息 = f"成功{模式字符串}批量加载 {len(文件名列表)} 张图像 (共 {文件总数} 个)。"
+        if 失败数量: 成功消息 += f" 加载失败 {失败数量} 张。"
+        if 丢弃数量: 成功消息 += f" 因尺寸不一致丢弃 {丢弃数量} 张。"
+        成功消息 += _解码缓存.统计文本()
+        if 预取数量: 成功消息 += f" 后台预取 {已预取} 张。"
+        print(f"[{self.节点名称}] {成功消息}")
+
+        return (图像批次, "\n".join(文件名列表), json.dumps(元数据列表, ensure_ascii=False, indent=4), 文件总数, 成功消息, "\n".join(完整路径列表))
+
+class 按序号读取标记图像元数据_V5(按序号加载标记图像_V5):
+    """
+    按序号读取标记图像元数据 - 与加载节点使用相同的筛选/排序/随机逻辑，
+    但只流式读取文件头部的文本块（PNG tEXt/iTXt/zTXt、JPEG/WebP EXIF UserComment），
+    完全不解码像素。适合只需要 元数据 (JSON) 做规则检测的分类工作流。
+    """
+
+    节点名称 = "按序号读取标记图像元数据_V5"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        输入 = super().INPUT_TYPES()
+        # 不解码像素，解码相关的可选项不适用
+        输入["optional"] = {k: v for k, v in 输入["optional"].items() if k not in ("解码缓存上限MB", "预取数量")}
+        return 输入
+
+    RETURN_TYPES = ("STRING", "STRING", "INT", "STRING", "STRING")
+    RETURN_NAMES = ("文件名", "元数据 (JSON)", "文件总数", "状态信息", "完整路径")
+    FUNCTION = "读取元数据"
+
+    def 读取元数据(self, **kwargs):
+        文件夹路径 = kwargs.get("文件夹路径")
+        序号 = kwargs.get("序号")
+        排序方式 = kwargs.get("排序方式")
+        随机种子 = kwargs.get("随机种子")
+        文件扩展名 = kwargs.get("文件扩展名")
+        搜索标记 = kwargs.get("搜索标记")
+        排除标记 = kwargs.get("排除标记")
+        从名称中移除搜索标记 = kwargs.get("从名称中移除搜索标记")
+
+        已排序文件列表, 状态消息 = self._筛选并排序文件(文件夹路径, 搜索标记, 排除标记, 排序方式, 文件扩展名,
+                                               kwargs.get("递归扫描", False), kwargs.get("包含模式", ""), kwargs.get("排除模式", ""))
+        文件总数 = len(已排序文件列表)
+        print(f"[{self.节点名称}] {状态消息}")
+
+        if "错误:" in 状态消息 or not 已排序文件列表:
+            return ("", "", 0, 状态消息, "")
+
+        最终序号, 是随机模式 = self._确定最终序号(已排序文件列表, 序号, 排序方式, 随机种子, kwargs.get("采样策略", _采样策略选项[0]))
+        if not (0 <= 最终序号 < 文件总数):
+            错误消息 = f"错误: 最终序号 {最终序号} 超出范围 (0 到 {文件总数 - 1})。"
+            print(f"[{self.节点名称}] {错误消息}")
+            return ("", "", 文件总数, 错误消息, "")
+
+        选中的文件信息 = 已排序文件列表[最终序号]
+        待读取的完整路径 = 选中的文件信息["完整路径"]
+        待返回的文件名 = 选中的文件信息["文件名"]
+        if 从名称中移除搜索标记 and 搜索标记:
+            待返回的文件名 = 待返回的文件名.replace(搜索标记, "")
+
+        try:
+            metadata_json_str = json.dumps(self._读取头部元数据(待读取的完整路径), ensure_ascii=False, indent=4)
+        except Exception as e:
+            错误消息 = f"错误: 读取元数据 '{待读取的完整路径}' 失败: {e}"
+            print(f"[{self.节点名称}] {错误消息}")
+            return (待返回的文件名, "", 文件总数, 错误消息, 待读取的完整路径)
+
+        模式字符串 = "随机" if 是随机模式 else ""
+        成功消息 = f"成功{模式字符串}读取序号 {最终序号} 的元数据: '{待返回的文件名}' (共 {文件总数} 个)。"
+        print(f"[{self.节点名称}] {成功消息}")
+        return (待返回的文件名, metadata_json_str, 文件总数, 成功消息, 待读取的完整路径)
+
+# --- 流式遍历 API（可脱离 ComfyUI 使用） ---
+
+class 延迟图像:
+    """按需解码的图像：第一次调用 numpy()/tensor() 时才读取像素（若已在后台预读则直接取结果）。"""
+
+    def __init__(self, 完整路径: str, 解码器: 按序号加载标记图像_V5, 预读任务: Optional[Future] = None):
+        self.完整路径 = 完整路径
+        self._解码器 = 解码器
+        self._预读任务 = 预读任务
+        self._图像_u8: Optional[np.ndarray] = None
+
+    def numpy(self) -> np.ndarray:
+        """uint8 的 HxWxC 数组（RGB、RGBA 或单通道灰度）。"""
+        if self._图像_u8 is None:
+            if self._预读任务 is not None:
+                self._图像_u8 = self._预读任务.result()[0]
+                self._预读任务 = None
+            else:
+                self._图像_u8 = self._解码器._解码图像文件(self.完整路径)[0]
+        return self._图像_u8
+
+    def tensor(self) -> torch.Tensor:
+        """ComfyUI 的 IMAGE 张量 (1xHxWxC, float32, 0-1)。"""
+        return self._解码器._转为图像张量(self.numpy())
+
+def 遍历标记图像(文件夹路径: str, 文件扩展名: str = "png,jpg,jpeg,webp", 搜索标记: str = "", 排除标记: str = "",
+             排序方式: str = "文件名_升序", 递归扫描: bool = False, 包含模式: str = "", 排除模式: str = "",
+             随机种子: int = 0, 采样策略: str = _采样策略选项[0], 预读数量: int = 0) -> Iterator[Tuple[str, Dict[str, Any], 延迟图像]]:
+    """
+    按与加载节点相同的筛选/排序规则流式遍历文件夹，依次产出 (完整路径, 元数据, 延迟图像)。
+    元数据只读取文件头部（与元数据节点的 JSON 结构相同）；像素在调用 延迟图像.numpy()/tensor() 时才解码，
+    且不进入进程级解码缓存，内存占用只与 预读数量 有关。排序方式可用选项值（如 "修改时间_降序"）或界面标签；
+    "随机" 时按 随机种子 和 采样策略 产出一个完整的不重复排列。
+    """
+    工具 = 按序号读取标记图像元数据_V5()
+    排序标签 = 工具.排序选项标签[工具.排序选项值.index(排序方式)] if 排序方式 in 工具.排序选项值 else 排序方式
+    文件索引, 状态消息 = 工具._筛选并排序文件(文件夹路径, 搜索标记, 排除标记, 排序标签, 文件扩展名, 递归扫描, 包含模式, 排除模式)
+    if "错误:" in 状态消息:
+        raise ValueError(状态消息)
+    if not 文件索引:
+        return
+
+    路径列表 = 文件索引.快照()
+    if 排序标签 == 工具.排序选项标签[-1]:
+        采样器 = _获取采样器(文件索引, 采样策略)
+        路径列表 = [路径列表[采样器.抽取(i, max(随机种子, 0))] for i in range(len(路径列表))]
+
+    线程池 = ThreadPoolExecutor(max_workers=min(预读数量, _预取最大线程数)) if 预读数量 > 0 else None
+    预读队列: "deque[Future]" = deque()
+    try:
+        for 序号, 完整路径 in enumerate(路径列表):
+            if 线程池:
+                # 保持窗口内始终有 预读数量 张图像在后台解码
+                while len(预读队列) < 预读数量 and 序号 + len(预读队列) < len(路径列表):
+                    预读队列.append(线程池.submit(工具._解码图像文件, 路径列表[序号 + len(预读队列)]))
+            预读任务 = 预读队列.popleft() if 预读队列 else None
+            try:
+                元数据 = 工具._读取头部元数据(完整路径)
+            except OSError as e:
+                print(f"[遍历标记图像] 警告: 读取 '{完整路径}' 失败: {e}")
+                continue
+            yield 完整路径, 元数据, 延迟图像(完整路径, 工具, 预读任务)
+    finally:
+        if 线程池:
+            for 任务 in 预读队列: 任务.cancel()
+            线程池.shutdown(wait=False)
+
+def _命令行入口() -> None:
+    import argparse
+    import sys
+
+    参数解析器 = argparse.ArgumentParser(description="按加载节点的筛选/排序规则遍历图像文件夹，逐行输出 JSON 元数据。")
+    参数解析器.add_argument("文件夹路径", nargs="+", help="一个或多个根目录")
+    # 每个选项同时提供英文别名，与 clean_1x1_png.py 的命令行写法保持一致
+    参数解析器.add_argument("--扩展名", "--extensions", dest="扩展名", default="png,jpg,jpeg,webp")
+    参数解析器.add_argument("--搜索标记", "--search-marker", dest="搜索标记", default="")
+    参数解析器.add_argument("--排除标记", "--exclude-marker", dest="排除标记", default="")
+    参数解析器.add_argument("--排序", "--sort", dest="排序", default="文件名_升序", choices=按序号加载标记图像_V5.排序选项值)
+    参数解析器.add_argument("--种子", "--seed", dest="种子", type=int, default=0, help="随机排序时使用的种子")
+    参数解析器.add_argument("-r", "--递归", "--recursive", dest="递归", action="store_true")
+    参数解析器.add_argument("--包含", "--include", dest="包含", default="", help="分号分隔的 glob，或以 re: 开头的正则")
+    参数解析器.add_argument("--排除", "--exclude", dest="排除", default="", help="分号分隔的 glob，或以 re: 开头的正则")
+    参数解析器.add_argument("--解码", "--decode", dest="解码", action="store_true", help="同时解码像素并输出尺寸/通道数（用于校验）")
+    参数解析器.add_argument("--预读", "--prefetch", dest="预读", type=int, default=2, help="--解码 时后台预读的图像数")
+    参数 = 参数解析器.parse_args()
+
+    for 完整路径, 元数据, 图像 in 遍历标记图像(";".join(参数.文件夹路径), 参数.扩展名, 参数.搜索标记, 参数.排除标记, 参数.排序,
+                                      参数.递归, 参数.包含, 参数.排除, 参数.种子, 预读数量=参数.预读 if 参数.解码 else 0):
+        记录 = {"path": 完整路径, **元数据}
+        if 参数.解码:
+            记录["shape"] = list(图像.numpy().shape)
+        sys.stdout.write(json.dumps(记录, ensure_ascii=False) + "\n")
+
 # --- 节点注册 (保持不变) ---
 NODE_CLASS_MAPPINGS = {
-    "GetMarkedImageByIndex_AutoData_V5_CN": 按序号加载标记图像_V5
+    "GetMarkedImageByIndex_AutoData_V5_CN": 按序号加载标记图像_V5,
+    "GetMarkedImageBatchByIndex_AutoData_V5_CN": 按序号批量加载标记图像_V5,
+    "GetMarkedImageMetadataByIndex_AutoData_V5_CN": 按序号读取标记图像元数据_V5,
 }
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "GetMarkedImageByIndex_AutoData_V5_CN": "按序号加载标记图像 V5 [自动数据]"
-}
\ No newline at end of file
+    "GetMarkedImageByIndex_AutoData_V5_CN": "按序号加载标记图像 V5 [自动数据]",
+    "GetMarkedImageBatchByIndex_AutoData_V5_CN": "按序号批量加载标记图像 V5 [自动数据]",
+    "GetMarkedImageMetadataByIndex_AutoData_V5_CN": "按序号读取标记图像元数据 V5 [自动数据]",
+}
+
+if __name__ == "__main__":
+    _命令行入口()
@@ -0,0 +1,262 @@
+# ComfyUI-AutoData-for-lora/image_header_reader.py
+"""
+只读取图像文件头部的元数据，不解码像素。
+- PNG: 逐块读取 IHDR / tEXt / zTXt / iTXt / eXIf，IDAT 等数据块直接 seek 跳过。
+- JPEG: 读取 SOF 尺寸、APP1 中的 EXIF UserComment 与 XMP、COM 注释，遇到 SOS（像素数据）即停止。
+- WebP: 读取 VP8X/VP8/VP8L 尺寸以及 EXIF、XMP 块。
+每张图只需读取几 KB（数据块头部），适合对整个文件夹做元数据分类。
+"""
+import html
+import re
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+_PNG签名 = b"\x89PNG\r\n\x1a\n"
+_最大文本长度 = 64 * 1024 * 1024  # 与 PIL 的 MAX_TEXT_CHUNK 同量级，防止压缩炸弹
+_XMP前缀 = b"http://ns.adobe.com/xap/1.0/\x00"
+_XMP键 = "XML:com.adobe.xmp"  # 与 PNG iTXt 块以及 PIL 的 info 键名相同
+
+# --- EXIF ---
+
+def _解码用户注释(数据: bytes) -> str:
+    """按 EXIF UserComment 的 8 字节字符集前缀解码。"""
+    前缀, 内容 = 数据[:8], 数据[8:]
+    if 前缀 == b"UNICODE\x00":
+        # piexif / A1111 写入大端 UTF-16，部分工具按 TIFF 字节序写小端；用前 64 字节中零字节的位置判断
+        样本 = 内容[:64]
+        偶数位零 = sum(1 for i in range(0, len(样本), 2) if 样本[i] == 0)
+        奇数位零 = sum(1 for i in range(1, len(样本), 2) if 样本[i] == 0)
+        编码 = "utf-16-be" if 偶数位零 >= 奇数位零 else "utf-16-le"
+        return 内容.decode(编码, errors="ignore").rstrip("\x00")
+    if 前缀 in (b"ASCII\x00\x00\x00", b"\x00" * 8):
+        return 内容.decode("utf-8", errors="ignore").rstrip("\x00")
+    return 数据.decode("utf-8", errors="ignore").rstrip("\x00")
+
+def _读取IFD(数据: bytes, 偏移: int, 字节序: str) -> Dict[int, Tuple[int, int, bytes]]:
+    """返回 {标签: (类型, 数量, 值字段的 4 字节)}。"""
+    条目 = {}
+    if 偏移 + 2 > len(数据):
+        return 条目
+    (数量,) = struct.unpack_from(字节序 + "H", 数据, 偏移)
+    for i in range(数量):
+        位置 = 偏移 + 2 + i * 12
+        if 位置 + 12 > len(数据):
+            break
+        标签, 类型, 个数 = struct.unpack_from(字节序 + "HHI", 数据, 位置)
+        条目[标签] = (类型, 个数, 数据[位置 + 8:位置 + 12])
+    return 条目
+
+def 解析EXIF(数据: bytes) -> Tuple[Optional[str], Optional[int]]:
+    """从 TIFF 结构的 EXIF 数据中取出 (UserComment, Orientation)。数据可以带 'Exif\\0\\0' 前缀。"""
+    if 数据.startswith(b"Exif\x00\x00"):
+        数据 = 数据[6:]
+    if len(数据) < 8 or 数据[:2] not in (b"II", b"MM"):
+        return None, None
+    字节序 = "<" if 数据[:2] == b"II" else ">"
+    (首个IFD,) = struct.unpack_from(字节序 + "I", 数据, 4)
+    ifd0 = _读取IFD(数据, 首个IFD, 字节序)
+
+    方向 = None
+    if 0x0112 in ifd0:
+        (方向,) = struct.unpack_from(字节序 + "H", ifd0[0x0112][2])
+
+    用户注释 = None
+    if 0x8769 in ifd0:
+        (exif偏移,) = struct.unpack_from(字节序 + "I", ifd0[0x8769][2])
+        exif_ifd = _读取IFD(数据, exif偏移, 字节序)
+        if 0x9286 in exif_ifd:
+            _, 个数, 值 = exif_ifd[0x9286]
+            if 个数 <= 4:
+                原始 = 值[:个数]
+            else:
+                (值偏移,) = struct.unpack_from(字节序 + "I", 值)
+                原始 = 数据[值偏移:值偏移 + 个数]
+            用户注释 = _解码用户注释(原始)
+    return 用户注释, 方向
+
+def _写入EXIF(结果: Dict[str, Any], 数据: bytes) -> None:
+    用户注释, 方向 = 解析EXIF(数据)
+    if 用户注释:
+        结果["文本"].setdefault("UserComment", 用户注释)
+    if 方向:
+        结果["方向"] = 方向
+
+# --- XMP ---
+
+_XMP字段 = ("exif:UserComment", "dc:description", "tiff:ImageDescription")
+
+def 解析XMP(xmp: str) -> str:
+    """从 XMP 包中按 exif:UserComment > dc:description > tiff:ImageDescription 取出第一个非空的文本。"""
+    for 字段 in _XMP字段:
+        # 属性写法: <rdf:Description exif:UserComment="..."/>
+        匹配 = re.search(r'\b%s="([^"]*)"' % re.escape(字段), xmp)
+        if not 匹配:
+            # 元素写法: <exif:UserComment><rdf:Alt><rdf:li xml:lang="x-default">...</rdf:li></rdf:Alt></exif:UserComment>
+            匹配 = re.search(r"<%s\b[^>]*>(.*?)</%s>" % (re.escape(字段), re.escape(字段)), xmp, re.S)
+            if 匹配 and "<rdf:li" in 匹配.group(1):
+                匹配 = re.search(r"<rdf:li\b[^>]*>(.*?)</rdf:li>", 匹配.group(1), re.S)
+        if 匹配:
+            值 = html.unescape(匹配.group(1)).strip()
+            if 值:
+                return 值
+    return ""
+
+# --- PNG ---
+
+def _解压文本(数据: bytes) -> bytes:
+    解压器 = zlib.decompressobj()
+    文本 = 解压器.decompress(数据, _最大文本长度)
+    if 解压器.unconsumed_tail:
+        raise ValueError("压缩文本块过大")
+    return 文本
+
+def _读取PNG(f, 结果: Dict[str, Any]) -> None:
+    文本 = 结果["文本"]
+    while True:
+        块头 = f.read(8)
+        if len(块头) < 8:
+            break
+        长度, 类型 = struct.unpack(">I4s", 块头)
+        if 类型 == b"IEND" or 长度 > 0x7FFFFFFF:
+            break
+        if 类型 not in (b"IHDR", b"tEXt", b"zTXt", b"iTXt", b"eXIf"):
+            f.seek(长度 + 4, 1)  # 跳过数据和 CRC
+            continue
+
+        数据 = f.read(长度)
+        f.seek(4, 1)
+        try:
+            if 类型 == b"IHDR":
+                结果["宽度"], 结果["高度"] = struct.unpack(">II", 数据[:8])
+            elif 类型 == b"eXIf":
+                _写入EXIF(结果, 数据)
+            elif 类型 == b"tEXt":
+                键, _, 值 = 数据.partition(b"\x00")
+                文本[键.decode("latin-1")] = 值.decode("latin-1", errors="replace")
+            elif 类型 == b"zTXt":
+                键, _, 值 = 数据.partition(b"\x00")
+                文本[键.decode("latin-1")] = _解压文本(值[1:]).decode("latin-1", errors="replace")
+            else:
+                键, _, 剩余 = 数据.partition(b"\x00")
+                压缩标志 = 剩余[0] if 剩余 else 0
+                _, _, 剩余 = 剩余[2:].partition(b"\x00")  # 语言标签
+                _, _, 值 = 剩余.partition(b"\x00")        # 翻译后的关键字
+                if 压缩标志:
+                    值 = _解压文本(值)
+                文本[键.decode("latin-1")] = 值.decode("utf-8", errors="replace")
+        except (ValueError, zlib.error, struct.error):
+            continue
+
+# --- JPEG ---
+
+def _读取JPEG(f, 结果: Dict[str, Any]) -> None:
+    文本 = 结果["文本"]
+    while True:
+        字节 = f.read(1)
+        if not 字节:
+            break
+        if 字节 != b"\xff":
+            continue
+        标记 = f.read(1)
+        while 标记 == b"\xff":
+            标记 = f.read(1)
+        if not 标记:
+            break
+        标记值 = 标记[0]
+        if 标记值 == 0x01 or 0xD0 <= 标记值 <= 0xD8:
+            continue  # 无长度字段的标记
+        if 标记值 in (0xD9, 0xDA):
+            break  # EOI / SOS：之后是像素数据
+        长度字节 = f.read(2)
+        if len(长度字节) < 2:
+            break
+        (长度,) = struct.unpack(">H", 长度字节)
+        是SOF = 0xC0 <= 标记值 <= 0xCF and 标记值 not in (0xC4, 0xC8, 0xCC)
+        if 标记值 not in (0xE1, 0xFE) and not 是SOF:
+            f.seek(长度 - 2, 1)
+            continue
+
+        数据 = f.read(长度 - 2)
+        if 是SOF and len(数据) >= 5:
+            结果["高度"], 结果["宽度"] = struct.unpack(">HH", 数据[1:5])
+        elif 标记值 == 0xFE:
+            文本.setdefault("comment", 数据.decode("utf-8", errors="replace"))
+        elif 数据.startswith(b"Exif\x00\x00"):
+            try:
+                _写入EXIF(结果, 数据)
+            except struct.error:
+                pass
+        elif 数据.startswith(_XMP前缀):
+            文本.setdefault(_XMP键, 数据[len(_XMP前缀):].decode("utf-8", errors="replace"))
+
+# --- WebP ---
+
+def _读取WebP(f, 结果: Dict[str, Any]) -> None:
+    文本 = 结果["文本"]
+    f.seek(12)
+    while True:
+        块头 = f.read(8)
+        if len(块头) < 8:
+            break
+        类型, 长度 = 块头[:4], struct.unpack("<I", 块头[4:])[0]
+        填充后长度 = 长度 + (长度 & 1)
+        if 类型 in (b"VP8X", b"VP8 ", b"VP8L"):
+            数据 = f.read(min(长度, 10))
+            f.seek(填充后长度 - len(数据), 1)
+            if 类型 == b"VP8X" and len(数据) >= 10:
+                结果["宽度"] = int.from_bytes(数据[4:7], "little") + 1
+                结果["高度"] = int.from_bytes(数据[7:10], "little") + 1
+            elif 类型 == b"VP8 " and len(数据) >= 10 and "宽度" not in 结果:
+                结果["宽度"] = struct.unpack("<H", 数据[6:8])[0] & 0x3FFF
+                结果["高度"] = struct.unpack("<H", 数据[8:10])[0] & 0x3FFF
+            elif 类型 == b"VP8L" and len(数据) >= 5 and 数据[0] == 0x2F and "宽度" not in 结果:
+                位 = int.from_bytes(数据[1:5], "little")
+                结果["宽度"] = (位 & 0x3FFF) + 1
+                结果["高度"] = ((位 >> 14) & 0x3FFF) + 1
+        elif 类型 == b"EXIF":
+            数据 = f.read(长度)
+            f.seek(填充后长度 - 长度, 1)
+            try:
+                _写入EXIF(结果, 数据)
+            except struct.error:
+                pass
+        elif 类型 == b"XMP ":
+            数据 = f.read(长度)
+            f.seek(填充后长度 - 长度, 1)
+            文本.setdefault(_XMP键, 数据.decode("utf-8", errors="replace"))
+        else:
+            f.seek(填充后长度, 1)
+
+# --- 对外接口 ---
+
+def 读取图像头部元数据(路径: str) -> Dict[str, Any]:
+    """
+    返回 {"格式", "宽度", "高度", "文本"}。宽高已按 EXIF 方向（5-8 为旋转 90°）交换，
+    与 ImageOps.exif_transpose 后的尺寸一致；无法识别时宽高为 None、文本为空。
+    """
+    结果: Dict[str, Any] = {"格式": "未知", "文本": {}}
+    with open(路径, "rb") as f:
+        签名 = f.read(12)
+        if 签名[:8] == _PNG签名:
+            结果["格式"] = "PNG"
+            f.seek(8)
+            _读取PNG(f, 结果)
+        elif 签名[:2] == b"\xff\xd8":
+            结果["格式"] = "JPEG"
+            f.seek(2)
+            _读取JPEG(f, 结果)
+        elif 签名[:4] == b"RIFF" and 签名[8:12] == b"WEBP":
+            结果["格式"] = "WEBP"
+            _读取WebP(f, 结果)
+
+    宽度, 高度 = 结果.get("宽度"), 结果.get("高度")
+    if 结果.pop("方向", None) in (5, 6, 7, 8):
+        宽度, 高度 = 高度, 宽度
+    结果["宽度"], 结果["高度"] = 宽度, 高度
+    return 结果
+
+def 提取嵌入参数(文本: Dict[str, str]) -> str:
+    """按 A1111 parameters > ComfyUI prompt > EXIF UserComment > XMP 的优先级取出嵌入的生成参数。"""
+    return (文本.get("parameters") or 文本.get("prompt") or 文本.get("UserComment")
+            or 解析XMP(文本.get(_XMP键, "")) or "")
@@ -1,29 +1,410 @@
 # ComfyUI-Nodes/metadata_rule_detector_v3.py
 import os
 import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+try:
+    from .A1111_metadata_parser import parse_a1111_parameters
+except ImportError:
+    from A1111_metadata_parser import parse_a1111_parameters
 
 # --- 全局变量和辅助函数 ---
 NODE_FILE_DIR = os.path.dirname(__file__)
 RULE_FOLDER_NAME = "rules"
 RULES_DIR_PATH = os.path.join(NODE_FILE_DIR, RULE_FOLDER_NAME)
+# 规则集文件：每行一个规则文件名（相对于 rules/），按顺序组成任意长度的规则链，供批量检测节点使用
+RULE_SET_FOLDER_NAME = "规则集"
+RULE_SETS_DIR_PATH = os.path.join(RULES_DIR_PATH, RULE_SET_FOLDER_NAME)
+
+# 规则文件夹不存在时在节点加载时自动创建
+for _目录 in (RULES_DIR_PATH, RULE_SETS_DIR_PATH):
+    if not os.path.isdir(_目录):
+        try:
+            os.makedirs(_目录)
+            print(f"[元数据规则检测器 V3] 提示: 已自动创建规则文件夹 '{_目录}'。")
+        except Exception as e:
+            print(f"[元数据规则检测器 V3] 错误: 创建规则文件夹 '{_目录}' 失败: {e}")
+
+# --- 规则编译缓存 ---
+# 每个规则文件按 (路径, 是否区分大小写) 只在 mtime/大小变化时重新解析一次。
+# 同一次检测中所有选中规则的关键词去重后合并成一张表，每个关键词只对元数据做一次 `in` 查找（C 实现的子串搜索），
+# 得到一个命中位集；每一行 OR 条件预先编译为 (包含掩码, 排除掩码)，用两次位运算即可判定。
+#
+# 除普通关键词外，每个条件还可以是（前面加 '!' 取反；条件内的逗号写作 '\,'）：
+#   ~正则              在整段元数据中搜索正则
+#   @字段              字段存在且非空，例如 @workflow
+#   @字段:文本          字段包含文本，例如 @negative:nsfw
+#   @字段~正则          字段匹配正则，例如 @sampler~^DPM\+\+
+#   @字段>=数值         数值比较（> >= < <= = == !=），例如 @steps>=30、@cfg<5；值不是数字时 = / != 按文本比较
+# 字段来自 A1111 parameters：positive、negative 以及参数行中的任意键（steps、sampler、cfg、seed、size、width、height、
+# model、model hash 等，大小写和下划线不敏感）；workflow 表示元数据中带有 ComfyUI 的 JSON 工作流。
+# 普通关键词先用位集判定，通过后才按 (代价, 通过率) 顺序计算其余条件，并短路。
+
+# 字段别名 -> A1111 参数键（小写）
+_字段别名 = {
+    "正面": "positive", "正面提示词": "positive", "prompt": "positive",
+    "负面": "negative", "负面提示词": "negative", "negative prompt": "negative",
+    "cfg": "cfg scale", "hash": "model hash", "工作流": "workflow",
+}
+
+def _规范字段名(名称: str) -> str:
+    名称 = 名称.strip().lower().replace('_', ' ')
+    return _字段别名.get(名称, 名称)
+
+class _检测上下文:
+    """一条元数据的检测状态。字段只在第一次遇到字段条件时才解析。"""
+
+    def __init__(self, 原文: str, 比较文本: str, 区分大小写: bool):
+        self.原文 = 原文
+        self.比较文本 = 比较文本
+        self.区分大小写 = 区分大小写
+        self._字段 = None
+
+    @property
+    def 字段(self) -> dict:
+        if self._字段 is None:
+            self._字段 = _解析字段(self.原文)
+        return self._字段
+
+def _解析字段(元数据: str) -> dict:
+    """元数据可以是加载节点输出的 JSON（取其中的 parameters），也可以直接是 parameters 文本。"""
+    parameters = 元数据
+    try:
+        数据 = json.loads(元数据)
+        if isinstance(数据, dict):
+            parameters = 数据.get("parameters") or ""
+    except (json.JSONDecodeError, TypeError):
+        pass
+    if not isinstance(parameters, str):
+        parameters = json.dumps(parameters, ensure_ascii=False)
+
+    字段 = {"workflow": ""}
+    if parameters.lstrip().startswith('{'):
+        # ComfyUI 的 prompt / workflow JSON，没有 A1111 字段
+        字段["workflow"] = parameters
+        return 字段
+    解析结果 = parse_a1111_parameters(parameters)
+    字段["positive"] = 解析结果["positive"].strip()
+    字段["negative"] = 解析结果["negative"].strip()
+    for 键, 值 in 解析结果["settings"].items():
+        字段[_规范字段名(键)] = 值
+    if 解析结果["width"]:
+        字段["width"], 字段["height"] = str(解析结果["width"]), str(解析结果["height"])
+    return 字段
+
+_数值正则 = re.compile(r'[-+]?\d+(?:\.\d+)?')
+_比较运算 = {
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    "=": lambda a, b: a == b, "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+}
+
+class _谓词:
+    """位集之外的单个条件。记录执行/通过次数，用于在同一行内把更便宜、更容易失败的条件排到前面。"""
+
+    代价 = 1.0
+
+    def __init__(self, 描述: str, 取反: bool):
+        self.描述 = 描述
+        self.取反 = 取反
+        self.执行次数 = 0
+        self.通过次数 = 0
+
+    def 判定(self, 上下文: _检测上下文) -> bool:
+        结果 = self._求值(上下文) != self.取反
+        self.执行次数 += 1
+        self.通过次数 += 结果
+        return 结果
+
+    def 排序键(self) -> float:
+        # AND 短路的最优顺序：按 代价 / 失败概率 升序
+        通过率 = (self.通过次数 + 1) / (self.执行次数 + 2)
+        return self.代价 / max(1.0 - 通过率, 0.01)
+
+    def _求值(self, 上下文: _检测上下文) -> bool:
+        raise NotImplementedError
+
+class _正则谓词(_谓词):
+    代价 = 4.0
+
+    def __init__(self, 描述, 取反, 模式: str, 区分大小写: bool, 字段名: str = None):
+        super().__init__(描述, 取反)
+        self.正则 = re.compile(模式, 0 if 区分大小写 else re.IGNORECASE)
+        self.字段名 = 字段名
+        if 字段名 is not None:
+            self.代价 = 3.0
+
+    def _求值(self, 上下文):
+        文本 = 上下文.原文 if self.字段名 is None else 上下文.字段.get(self.字段名)
+        return bool(文本) and self.正则.search(文本) is not None
+
+class _字段文本谓词(_谓词):
+    代价 = 2.0
+
+    def __init__(self, 描述, 取反, 字段名: str, 运算: str, 文本: str, 区分大小写: bool):
+        super().__init__(描述, 取反)
+        self.字段名, self.运算, self.区分大小写 = 字段名, 运算, 区分大小写
+        self.文本 = 文本 if 区分大小写 else 文本.lower()
+
+    def _求值(self, 上下文):
+        值 = 上下文.字段.get(self.字段名)
+        if self.运算 is None:
+            return bool(值)
+        if 值 is None:
+            return self.运算 == "!="
+        if not self.区分大小写:
+            值 = 值.lower()
+        if self.运算 == ":":
+            return self.文本 in 值
+        return (值.strip() == self.文本) != (self.运算 == "!=")
+
+class _数值谓词(_谓词):
+    代价 = 2.0
+
+    def __init__(self, 描述, 取反, 字段名: str, 运算: str, 数值: float):
+        super().__init__(描述, 取反)
+        self.字段名, self.比较, self.数值 = 字段名, _比较运算[运算], 数值
+
+    def _求值(self, 上下文):
+        匹配 = _数值正则.search(上下文.字段.get(self.字段名) or "")
+        return 匹配 is not None and self.比较(float(匹配.group()), self.数值)
+
+_字段条件正则 = re.compile(r'@([^:~<>=!]+?)\s*(>=|<=|!=|==|=|>|<|~|:)\s*(.*)$', re.DOTALL)
+
+def _编译条件(条件: str, case_sensitive: bool):
+    """返回 ('关键词', 是否排除, 关键词) 或 ('谓词', 谓词对象)。以 '\\' 开头时其后的文本按普通关键词处理（如 '\\@home'）。"""
+    取反 = 条件.startswith('!')
+    主体 = 条件[1:].strip() if 取反 else 条件
+    if 主体.startswith('\\'):
+        主体 = 主体[1:]
+    elif 主体.startswith('~'):
+        return ('谓词', _正则谓词(条件, 取反, 主体[1:], case_sensitive))
+    elif 主体.startswith('@'):
+        匹配 = _字段条件正则.match(主体)
+        if 匹配 is None:
+            return ('谓词', _字段文本谓词(条件, 取反, _规范字段名(主体[1:]), None, "", case_sensitive))
+        字段名, 运算, 值 = _规范字段名(匹配.group(1)), 匹配.group(2), 匹配.group(3)
+        if 运算 == '~':
+            return ('谓词', _正则谓词(条件, 取反, 值, case_sensitive, 字段名))
+        if 运算 == ':':
+            return ('谓词', _字段文本谓词(条件, 取反, 字段名, ':', 值, case_sensitive))
+        try:
+            return ('谓词', _数值谓词(条件, 取反, 字段名, 运算, float(值)))
+        except ValueError:
+            if 运算 in ("=", "==", "!="):
+                return ('谓词', _字段文本谓词(条件, 取反, 字段名, "!=" if 运算 == "!=" else "=", 值, case_sensitive))
+            raise ValueError(f"条件 '{条件}' 的比较值不是数字")
+    if not case_sensitive:
+        主体 = 主体.lower()
+    return ('关键词', 取反, 主体)
+
+class _已编译规则:
+    def __init__(self, 文件名: str, mtime_ns: int, 大小: int, 行列表: list):
+        self.文件名 = 文件名
+        self.mtime_ns = mtime_ns
+        self.大小 = 大小
+        # [(原始行, 包含关键词元组, 排除关键词元组, 谓词元组)]
+        self.行列表 = 行列表
+
+def _解析规则文件(rule_filepath: str, case_sensitive: bool) -> list:
+    行列表 = []
+    with open(rule_filepath, 'r', encoding='utf-8') as f:
+        # 遍历文件中的每一行（OR条件）
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            include_keywords = []
+            exclude_keywords = []
+            predicates = []
+
+            # 分离包含、排除的关键词和其它条件（'\,' 表示条件内的逗号）
+            for keyword in re.split(r'(?<!\\),', line):
+                keyword = keyword.strip().replace('\\,', ',')
+                if not keyword:
+                    continue
+                编译结果 = _编译条件(keyword, case_sensitive)
+                if 编译结果[0] == '谓词':
+                    predicates.append(编译结果[1])
+                elif 编译结果[1]:
+                    # 是排除词，去掉 '!' 并存入排除列表
+                    exclude_keywords.append(编译结果[2])
+                else:
+                    # 是包含词，存入包含列表
+                    include_keywords.append(编译结果[2])
+            predicates.sort(key=lambda 谓词: 谓词.代价)
+            行列表.append((line, tuple(include_keywords), tuple(exclude_keywords), tuple(predicates)))
+    return 行列表
+
+_规则编译缓存 = {}
+_规则集缓存 = {}
+_规则编译锁 = threading.Lock()
+
+def _获取已编译规则(rule_filename: str, case_sensitive: bool) -> _已编译规则:
+    """返回规则文件的编译结果，文件未变化时直接复用；文件不存在时抛出 FileNotFoundError。"""
+    rule_filepath = os.path.join(RULES_DIR_PATH, rule_filename)
+    状态 = os.stat(rule_filepath)
+    键 = (rule_filepath, case_sensitive)
+    with _规则编译锁:
+        已编译 = _规则编译缓存.get(键)
+    if 已编译 is not None and 已编译.mtime_ns == 状态.st_mtime_ns and 已编译.大小 == 状态.st_size:
+        return 已编译
+    已编译 = _已编译规则(rule_filename, 状态.st_mtime_ns, 状态.st_size, _解析规则文件(rule_filepath, case_sensitive))
+    with _规则编译锁:
+        _规则编译缓存[键] = 已编译
+    return 已编译
+
+def _获取规则集(rule_set_filename: str) -> list:
+    """返回规则集文件中按顺序列出的规则文件名（可省略 .txt），文件未变化时复用上次的解析结果。"""
+    rule_set_filepath = os.path.join(RULE_SETS_DIR_PATH, rule_set_filename)
+    状态 = os.stat(rule_set_filepath)
+    with _规则编译锁:
+        缓存 = _规则集缓存.get(rule_set_filepath)
+    if 缓存 is not None and 缓存[0] == (状态.st_mtime_ns, 状态.st_size):
+        return 缓存[1]
+    规则文件名列表 = []
+    with open(rule_set_filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            规则文件名列表.append(line if line.endswith(".txt") else line + ".txt")
+    with _规则编译锁:
+        _规则集缓存[rule_set_filepath] = ((状态.st_mtime_ns, 状态.st_size), 规则文件名列表)
+    return 规则文件名列表
+
+class _规则行:
+    __slots__ = ("包含掩码", "排除掩码", "谓词", "原始行", "计数")
+
+    # 每判定这么多次就按最新的通过率重新排列一次谓词
+    重排间隔 = 64
+
+    def __init__(self, 包含掩码: int, 排除掩码: int, 谓词: tuple, 原始行: str):
+        self.包含掩码, self.排除掩码, self.原始行 = 包含掩码, 排除掩码, 原始行
+        self.谓词 = list(谓词)
+        self.计数 = 0
+
+    def 判定(self, 位集: int, 上下文: _检测上下文) -> bool:
+        if 位集 & self.包含掩码 != self.包含掩码 or 位集 & self.排除掩码:
+            return False
+        if not self.谓词:
+            return True
+        self.计数 += 1
+        if self.计数 % self.重排间隔 == 0 and len(self.谓词) > 1:
+            self.谓词 = sorted(self.谓词, key=_谓词.排序键)
+        return all(谓词.判定(上下文) for 谓词 in self.谓词)
+
+class _规则匹配器:
+    """把一组有序规则的所有关键词合并去重，每个关键词对元数据只查找一次。"""
+
+    def __init__(self, 规则列表: list):
+        关键词序号 = {}
+        def 掩码(关键词组) -> int:
+            结果 = 0
+            for kw in 关键词组:
+                结果 |= 1 << 关键词序号.setdefault(kw, len(关键词序号))
+            return 结果
+        # 每条规则: [_规则行]；None 表示规则文件缺失，永不匹配
+        self.规则列表 = [
+            None if 规则 is None else [_规则行(掩码(包含), 掩码(排除), 谓词, 行) for 行, 包含, 排除, 谓词 in 规则.行列表]
+            for 规则 in 规则列表
+        ]
+        self.关键词列表 = list(关键词序号)
+
+    def 命中位集(self, 文本: str) -> int:
+        位集 = 0
+        for i, kw in enumerate(self.关键词列表):
+            if kw in 文本:
+                位集 |= 1 << i
+        return 位集
+
+    def 首个匹配(self, 位集: int, 上下文: _检测上下文):
+        """返回第一个匹配的规则序号（从 0 开始），都不匹配时返回 None。"""
+        for i in range(len(self.规则列表)):
+            if self.匹配行(i, 位集, 上下文) is not None:
+                return i
+        return None
+
+    def 匹配行(self, 规则序号: int, 位集: int, 上下文: _检测上下文):
+        """返回第 规则序号 条规则中第一个满足的行，没有则返回 None。"""
+        for 行 in self.规则列表[规则序号] or ():
+            if 行.判定(位集, 上下文):
+                return 行.原始行
+        return None
+
+_匹配器缓存 = OrderedDict()
+_匹配器缓存上限 = 32
+
+def _清理已删除规则(rule_filenames: list):
+    """从编译缓存和匹配器缓存中移除已不在规则文件夹中的文件。"""
+    现有路径 = {os.path.join(RULES_DIR_PATH, name) for name in rule_filenames}
+    with _规则编译锁:
+        for 键 in [键 for 键 in _规则编译缓存 if 键[0] not in 现有路径]:
+            已删除 = _规则编译缓存.pop(键)
+            for 匹配器键 in [k for k in _匹配器缓存 if 已删除 in k]:
+                del _匹配器缓存[匹配器键]
+
+def _获取规则匹配器(规则列表: list) -> _规则匹配器:
+    # 以编译结果对象本身为键：任一规则文件重新编译后自然生成新的匹配器
+    键 = tuple(规则列表)
+    with _规则编译锁:
+        匹配器 = _匹配器缓存.get(键)
+        if 匹配器 is not None:
+            _匹配器缓存.move_to_end(键)
+            return 匹配器
+    匹配器 = _规则匹配器(规则列表)
+    with _规则编译锁:
+        _匹配器缓存[键] = 匹配器
+        while len(_匹配器缓存) > _匹配器缓存上限:
+            _匹配器缓存.popitem(last=False)
+    return 匹配器
+
+# --- 规则列表热更新 ---
+# RULE_FILES 始终是同一个列表对象，原地更新。INPUT_TYPES（前端刷新节点定义、提交队列校验时都会调用）和 detect
+# 每次先 stat 规则文件夹，mtime 变化（增删、重命名文件）时才重新列出，无需重启 ComfyUI。
+# 已有规则文件内容的修改由编译缓存按文件 mtime 自行发现，只重新编译改动过的文件。
 
-# 在节点加载时，预先扫描一次规则文件夹
 RULE_FILES = ["[无]"]
-if os.path.isdir(RULES_DIR_PATH):
+RULE_SET_FILES = ["[无]"]
+_目录修改时间 = {}
+# 目录 mtime 距当前时间小于该值时不信任它（文件系统时间粒度可能很粗，同一时间片内的增删无法区分）
+_目录时间容差秒 = 2.0
+
+def _规则文件排序键(s):
+    return [int(c) if c.isdigit() else c.lower() for c in re.split('([0-9]+)', s)]
+
+def _刷新文件列表(目录: str, 文件列表: list):
+    """目录 mtime 变化时重新列出其中的 .txt 文件并原地写入 文件列表[1:]，返回新的文件名列表；未变化时返回 None。"""
     try:
-        rule_filenames = sorted(
-            [f for f in os.listdir(RULES_DIR_PATH) if f.endswith(".txt")],
-            key=lambda s: [int(c) if c.isdigit() else c.lower() for c in re.split('([0-9]+)', s)]
-        )
-        RULE_FILES.extend(rule_filenames)
-    except Exception as e:
-        print(f"[元数据规则检测器 V3] 错误: 扫描规则文件夹 '{RULES_DIR_PATH}' 失败: {e}")
-else:
+        目录修改时间 = os.stat(目录).st_mtime_ns
+    except OSError:
+        目录修改时间 = None
+    if 目录修改时间 is not None and 目录修改时间 == _目录修改时间.get(目录):
+        return None
     try:
-        os.makedirs(RULES_DIR_PATH)
-        print(f"[元数据规则检测器 V3] 提示: 已自动创建规则文件夹 '{RULES_DIR_PATH}'。")
+        文件名列表 = sorted(
+            [f for f in os.listdir(目录) if f.endswith(".txt")],
+            key=_规则文件排序键
+        ) if 目录修改时间 is not None else []
     except Exception as e:
-        print(f"[元数据规则检测器 V3] 错误: 创建规则文件夹 '{RULES_DIR_PATH}' 失败: {e}")
+        print(f"[元数据规则检测器 V3] 错误: 扫描规则文件夹 '{目录}' 失败: {e}")
+        return None
+    文件列表[1:] = 文件名列表
+    太新 = 目录修改时间 is not None and time.time_ns() - 目录修改时间 < _目录时间容差秒 * 1e9
+    _目录修改时间[目录] = None if 太新 else 目录修改时间
+    return 文件名列表
+
+def _刷新规则列表():
+    rule_filenames = _刷新文件列表(RULES_DIR_PATH, RULE_FILES)
+    if rule_filenames is not None:
+        _清理已删除规则(rule_filenames)
+    _刷新文件列表(RULE_SETS_DIR_PATH, RULE_SET_FILES)
+
+_刷新规则列表()
 
 
 class 元数据规则检测器_V3:
@@ -31,6 +412,7 @@ class 元数据规则检测器_V3:
     元数据规则检测器 (Metadata Rule Detector) V3 -
     根据外部规则文件(.txt)动态检测元数据。
     支持 AND/OR 逻辑，并引入了排除规则 '!' (AND NOT)。
+    条件还可以是正则 (~)、按 A1111 字段 (@字段) 的文本/正则/数值比较。
     可选择是否区分大小写，并根据匹配顺序或失败位置输出路由信号。
     """
     
@@ -39,6 +421,7 @@ class 元数据规则检测器_V3:
 
     @classmethod
     def INPUT_TYPES(cls):
+        _刷新规则列表()
         return {
             "required": {
                 "元数据": ("STRING", {"multiline": True, "default": ""}),
@@ -58,76 +441,32 @@ class 元数据规则检测器_V3:
     RETURN_NAMES = ("匹配位次",)
     FUNCTION = "detect"
 
-    def _parse_and_check_rule(self, rule_filename: str, metadata_text: str, case_sensitive: bool) -> bool:
-        """解析单个规则文件并根据其内容检查元数据，支持排除规则 '!'。"""
-        rule_filepath = os.path.join(RULES_DIR_PATH, rule_filename)
-
+    def _获取规则(self, rule_filename: str, case_sensitive: bool):
+        """返回编译后的规则，文件缺失或解析失败时打印提示并返回 None（视为不匹配）。"""
         try:
-            with open(rule_filepath, 'r', encoding='utf-8') as f:
-                # 遍历文件中的每一行（OR条件）
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    include_keywords = []
-                    exclude_keywords = []
-
-                    # 分离包含和排除的关键词
-                    for keyword in line.split(','):
-                        keyword = keyword.strip()
-                        if not keyword:
-                            continue
-                        
-                        if keyword.startswith('!'):
-                            # 是排除词，去掉 '!' 并存入排除列表
-                            exclude_keywords.append(keyword[1:])
-                        else:
-                            # 是包含词，存入包含列表
-                            include_keywords.append(keyword)
-                    
-                    # 根据 case_sensitive 选项决定是否将关键词转为小写
-                    if not case_sensitive:
-                        include_keywords = [kw.lower() for kw in include_keywords]
-                        exclude_keywords = [kw.lower() for kw in exclude_keywords]
-
-                    # 开始检查当前行的所有条件
-                    line_match = True
-                    
-                    # 1. 检查所有必须包含的词
-                    for kw in include_keywords:
-                        if kw not in metadata_text:
-                            line_match = False
-                            break
-                    if not line_match:
-                        continue # 当前行不匹配，检查下一行
-
-                    # 2. 检查所有必须排除的词
-                    for kw in exclude_keywords:
-                        if kw in metadata_text:
-                            line_match = False
-                            break
-                    
-                    # 如果所有条件都满足，则整行匹配成功，整个文件也匹配成功
-                    if line_match:
-                        print(f"    - 规则 '{rule_filename}' 匹配成功 (基于行: '{line}')")
-                        return True
-                        
+            return _获取已编译规则(rule_filename, case_sensitive)
         except FileNotFoundError:
             print(f"[{self.节点名称}] 警告: 规则文件 '{rule_filename}' 未找到。")
-            return False
         except Exception as e:
             print(f"[{self.节点名称}] 错误: 读取或解析规则文件 '{rule_filename}' 失败: {e}")
-            return False
-            
-        return False
+        return None
 
     def detect(self, 元数据: str, 规则_1: str, 规则_2: str, 规则_3: str, 规则_4: str, 区分大小写: bool):
         print(f"\n[{self.节点名称}] 节点开始执行...")
         print(f"  > 匹配模式: {'区分大小写' if 区分大小写 else '忽略大小写'}")
+        _刷新规则列表()
         
         search_text = 元数据 if 区分大小写 else 元数据.lower()
         selected_rules = [规则_1, 规则_2, 规则_3, 规则_4]
+        # 只编译 '[无]' 之前的规则；之后的位次不会被检测
+        active_rules = []
+        for rule_name in selected_rules:
+            if rule_name == "[无]":
+                break
+            active_rules.append(rule_name)
+        matcher = _获取规则匹配器([self._获取规则(name, 区分大小写) for name in active_rules])
+        hit_bits = matcher.命中位集(search_text)
+        context = _检测上下文(元数据, search_text, 区分大小写)
         
         for i, rule_name in enumerate(selected_rules):
             current_position = i + 1
@@ -138,9 +477,10 @@ class 元数据规则检测器_V3:
                 print(f"  > 输出: {current_position}")
                 return (current_position,)
             
-            match_found = self._parse_and_check_rule(rule_name, search_text, 区分大小写)
+            matched_line = matcher.匹配行(i, hit_bits, context)
             
-            if match_found:
+            if matched_line is not None:
+                print(f"    - 规则 '{rule_name}' 匹配成功 (基于行: '{matched_line}')")
                 print(f"[{self.节点名称}] 成功匹配！")
                 print(f"  > 输出: {current_position}")
                 return (current_position,)
@@ -149,10 +489,87 @@ class 元数据规则检测器_V3:
         print(f"  > 输出: 5")
         return (5,)
 
+class 元数据规则批量检测器_V3(元数据规则检测器_V3):
+    """
+    元数据规则批量检测器 -
+    使用 rules/规则集/ 中的规则集文件（每行一个规则文件名，数量不限）代替固定的四个规则槽，
+    一次调用检测一整批元数据，输出每条元数据的匹配位次列表：第 N 条规则匹配输出 N，都不匹配输出 规则数+1。
+    元数据可以是列表输入，也可以是批量加载节点输出的 JSON 数组字符串。
+    """
+
+    节点名称 = "元数据规则批量检测器 V3"
+    INPUT_IS_LIST = True
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        _刷新规则列表()
+        return {
+            "required": {
+                "元数据": ("STRING", {"multiline": True, "default": ""}),
+                "规则集": (RULE_SET_FILES, ),
+                "区分大小写": ("BOOLEAN", {
+                    "default": True, 
+                    "label_on": "是 (严格匹配)", 
+                    "label_off": "否 (忽略大小写)"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("INT", "STRING")
+    RETURN_NAMES = ("匹配位次列表", "匹配位次 (JSON)")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "detect_batch"
+
+    @staticmethod
+    def _展开元数据(元数据列表: list) -> list:
+        """JSON 数组字符串展开为其中的每一项（对象按单张加载节点的格式重新序列化），其它字符串原样保留。"""
+        结果 = []
+        for 元数据 in 元数据列表:
+            元数据 = str(元数据)
+            if 元数据.lstrip().startswith('['):
+                try:
+                    数组 = json.loads(元数据)
+                except json.JSONDecodeError:
+                    数组 = None
+                if isinstance(数组, list):
+                    结果.extend(项 if isinstance(项, str) else json.dumps(项, ensure_ascii=False, indent=4) for 项 in 数组)
+                    continue
+            结果.append(元数据)
+        return 结果
+
+    def detect_batch(self, 元数据: list, 规则集: list, 区分大小写: list):
+        规则集, 区分大小写 = 规则集[0], 区分大小写[0]
+        print(f"\n[{self.节点名称}] 节点开始执行...")
+        _刷新规则列表()
+
+        rule_names = []
+        if 规则集 != "[无]":
+            try:
+                rule_names = _获取规则集(规则集)
+            except FileNotFoundError:
+                print(f"[{self.节点名称}] 警告: 规则集文件 '{规则集}' 未找到。")
+            except Exception as e:
+                print(f"[{self.节点名称}] 错误: 读取规则集文件 '{规则集}' 失败: {e}")
+        matcher = _获取规则匹配器([self._获取规则(name, 区分大小写) for name in rule_names])
+
+        no_match = len(rule_names) + 1
+        positions = []
+        for text in self._展开元数据(元数据):
+            search_text = text if 区分大小写 else text.lower()
+            matched = matcher.首个匹配(matcher.命中位集(search_text), _检测上下文(text, search_text, 区分大小写))
+            positions.append(no_match if matched is None else matched + 1)
+
+        counts = {p: positions.count(p) for p in sorted(set(positions))}
+        print(f"  > 规则集 '{规则集}': {len(rule_names)} 条规则，{'区分大小写' if 区分大小写 else '忽略大小写'}，共检测 {len(positions)} 条元数据")
+        print(f"  > 各位次数量: {counts}")
+        return (positions, json.dumps(positions))
+
 # --- 节点注册 ---
 NODE_CLASS_MAPPINGS = {
-    "MetadataRuleDetector_AutoData_V3_CN": 元数据规则检测器_V3
+    "MetadataRuleDetector_AutoData_V3_CN": 元数据规则检测器_V3,
+    "MetadataRuleBatchDetector_AutoData_V3_CN": 元数据规则批量检测器_V3
 }
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "MetadataRuleDetector_AutoData_V3_CN": "元数据规则检测器[自动数据]"
+    "MetadataRuleDetector_AutoData_V3_CN": "元数据规则检测器[自动数据]",
+    "MetadataRuleBatchDetector_AutoData_V3_CN": "元数据规则批量检测器[自动数据]"
 }
\ No newline at end of file
@@ -1,5 +1,12 @@
 import os
 import re
+import mmap
+import bisect
+import random
+import itertools
+import threading
+from array import array
+from collections import OrderedDict
 import locale as sys_locale # 使用别名，避免与 ComfyUI 内部可能的 'locale' 模块冲突
 
 # --- 语言字符串设置 ---
@@ -18,6 +25,12 @@ MSG_FILE_NOT_EXISTS = "File does not exist: '{full_path}'"
 MSG_FILE_EMPTY = "File is empty, no lines to read."
 MSG_INDEX_OUT_OF_RANGE = "Index out of range. Total lines: {total_lines} (Index range 0 to {max_index}), requested index is {line_index}."
 MSG_SUCCESS_READ = "Successfully read line at index {line_index}."
+MSG_SUCCESS_READ_MULTI = "Successfully read {count} lines."
+MSG_SUCCESS_SAMPLE = "Successfully sampled {count} lines (seed {seed}, {mode})."
+MSG_INVALID_LINE_SPEC = "Invalid line spec '{line_spec}'. Use indices and ranges such as 0-9,15,20-25 or 30- (to the last line)."
+MSG_LINE_SPEC_TOO_LONG = "Line spec '{line_spec}' selects more than {max_lines} lines."
+MSG_SAMPLE_MODE_UNIFORM = "uniform"
+MSG_SAMPLE_MODE_WEIGHTED = "weighted"
 MSG_ERROR_READ_FILE = "Error reading file: {error}"
 MSG_CONSOLE_ERROR_READ = "Error reading file: {error}" # 内部控制台消息，保持英文或一致
 
@@ -36,18 +49,174 @@ if current_lang and current_lang.startswith("zh"):
     MSG_FILE_EMPTY = "文件为空，没有可读取的行。"
     MSG_INDEX_OUT_OF_RANGE = "索引超出范围。文件总行数: {total_lines} (索引范围 0 到 {max_index})，请求索引为 {line_index}。"
     MSG_SUCCESS_READ = "成功读取索引 {line_index} 的行。"
+    MSG_SUCCESS_READ_MULTI = "成功读取 {count} 行。"
+    MSG_SUCCESS_SAMPLE = "成功随机抽取 {count} 行（种子 {seed}，{mode}）。"
+    MSG_INVALID_LINE_SPEC = "行号列表 '{line_spec}' 无效。请使用如 0-9,15,20-25 或 30- (到最后一行) 的索引和范围。"
+    MSG_LINE_SPEC_TOO_LONG = "行号列表 '{line_spec}' 选中的行数超过了 {max_lines} 行。"
+    MSG_SAMPLE_MODE_UNIFORM = "均匀"
+    MSG_SAMPLE_MODE_WEIGHTED = "加权"
     MSG_ERROR_READ_FILE = "读取文件时发生错误: {error}"
     MSG_CONSOLE_ERROR_READ = "Error reading file: {error}" # 保持英文或根据需求汉化
 
 # --- 语言字符串设置结束 ---
 
+# --- 行偏移索引 ---
+# 每个文件只在 (mtime, size) 变化时扫描一次，记录每行的起始字节偏移；
+# 之后按索引读取只需 mmap 对应的字节区间，与文件大小无关。
+
+_LINE_INDEX_CACHE_SIZE = 32 # 最多缓存多少个文件的索引
+_MAX_LINE_SPEC_LINES = 100000 # 行号列表展开后最多选中多少行（允许重复行号）
+
+# 加权模式下行首的 "权重::" 前缀（与 Dynamic Prompts 通配符的 2::text 写法一致），没有前缀的行权重为 1
+_WEIGHT_PREFIX_RE = re.compile(rb'[ \t]*(\d+(?:\.\d+)?)[ \t]*::')
+# 文本模式的 readlines() 把单独的 '\r' 也当作换行（旧 Mac 格式或混合换行的文件）
+_LONE_CR_RE = re.compile(rb'\r(?!\n)')
+_LINE_BREAK_RE = re.compile(rb'\r\n|\r|\n')
+_WEIGHT_PREFIX_TEXT_RE = re.compile(r'^\s*\d+(?:\.\d+)?\s*::\s*')
+
+class _LineOffsetIndex:
+    """
+    一个文本文件的行起始偏移表。行的划分与文本模式下的 readlines() 一致（'\n'、'\r\n' 或单独的 '\r' 结尾，最后一行可以没有换行符）。
+    不长期持有文件句柄或 mmap，避免在 Windows 上锁住正被写入的词典文件。
+    """
+
+    def __init__(self, full_path, mtime_ns, size):
+        self.full_path = full_path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.starts = array('Q')
+        self._cumulative_weights = None
+        if size > 0:
+            with open(full_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.starts.append(0)
+                if _LONE_CR_RE.search(mm) is None:
+                    pos = mm.find(b'\n')
+                    while pos != -1 and pos + 1 < size:
+                        self.starts.append(pos + 1)
+                        pos = mm.find(b'\n', pos + 1)
+                else:
+                    # 旧 Mac 或混合换行的文件：逐个匹配换行符，较慢，只在出现单独的 '\r' 时使用
+                    for match in _LINE_BREAK_RE.finditer(mm):
+                        if match.end() < size:
+                            self.starts.append(match.end())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def cumulative_weights(self):
+        """各行 "权重::" 前缀的累计和，首次使用时扫描一次文件并缓存在索引上。"""
+        if self._cumulative_weights is None:
+            weights = []
+            with open(self.full_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in self.starts:
+                    match = _WEIGHT_PREFIX_RE.match(mm, start)
+                    weights.append(float(match.group(1)) if match else 1.0)
+            self._cumulative_weights = list(itertools.accumulate(weights))
+        return self._cumulative_weights
+
+    def read_lines(self, line_indices):
+        """返回给定索引（必须在范围内）对应的行内容，已去除首尾空白。"""
+        if not line_indices:
+            return []
+        total = len(self.starts)
+        with open(self.full_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = []
+            for i in line_indices:
+                end = self.starts[i + 1] if i + 1 < total else self.size
+                lines.append(mm[self.starts[i]:end].decode('utf-8').strip())
+            return lines
+
+_line_index_cache = OrderedDict()
+_line_index_lock = threading.Lock()
+
+def _get_line_index(full_path):
+    """返回文件的行偏移索引，文件的 mtime 或大小变化时重建。"""
+    stat = os.stat(full_path)
+    with _line_index_lock:
+        index = _line_index_cache.get(full_path)
+        if index is not None and index.mtime_ns == stat.st_mtime_ns and index.size == stat.st_size:
+            _line_index_cache.move_to_end(full_path)
+            return index
+
+    index = _LineOffsetIndex(full_path, stat.st_mtime_ns, stat.st_size)
+    with _line_index_lock:
+        _line_index_cache[full_path] = index
+        _line_index_cache.move_to_end(full_path)
+        while len(_line_index_cache) > _LINE_INDEX_CACHE_SIZE:
+            _line_index_cache.popitem(last=False)
+    return index
+
+def _parse_line_spec(line_spec, total_lines):
+    """
+    解析 "0-9,15,20-25,30-" 形式的行号列表（"30-" 表示到最后一行），返回 (按书写顺序展开的索引列表, 错误消息)。
+    范围先截取到 [0, total_lines) 再展开；行号可以重复（如 "0,0,0"），展开后总数超过 _MAX_LINE_SPEC_LINES 时视为错误。
+    """
+    indices = []
+    for part in line_spec.replace('，', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)\s*-\s*(\d*)', part)
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else max(start, total_lines - 1)
+            if min(start, end) >= total_lines:
+                return None, MSG_INDEX_OUT_OF_RANGE.format(total_lines=total_lines, max_index=total_lines-1, line_index=min(start, end))
+            if end >= start:
+                part_indices = range(start, min(end, total_lines - 1) + 1)
+            else:
+                part_indices = range(min(start, total_lines - 1), end - 1, -1)
+        elif part.isdigit():
+            if int(part) >= total_lines:
+                return None, MSG_INDEX_OUT_OF_RANGE.format(total_lines=total_lines, max_index=total_lines-1, line_index=int(part))
+            part_indices = (int(part),)
+        else:
+            return None, MSG_INVALID_LINE_SPEC.format(line_spec=line_spec)
+        if len(indices) + len(part_indices) > _MAX_LINE_SPEC_LINES:
+            return None, MSG_LINE_SPEC_TOO_LONG.format(line_spec=line_spec, max_lines=_MAX_LINE_SPEC_LINES)
+        indices.extend(part_indices)
+    if not indices:
+        return None, MSG_INVALID_LINE_SPEC.format(line_spec=line_spec)
+    return indices, None
+
+def _sample_indices(line_offsets, count, rng, weighted):
+    """不放回地抽取 count 个行索引。均匀模式 O(count)；加权模式使用按 "权重::" 前缀缓存的累计权重。"""
+    total = len(line_offsets)
+    count = min(count, total)
+    if not weighted:
+        return rng.sample(range(total), count)
+
+    cumulative = line_offsets.cumulative_weights()
+    if cumulative[-1] <= 0:
+        return rng.sample(range(total), count)
+    if count * 4 <= total:
+        # 只抽少量行时按累计权重二分，重复时重抽；权重集中在少数行上导致重抽过多时改用下面的方式
+        chosen = []
+        seen = set()
+        for _ in range(count * 16):
+            i = bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+            if i < total and i not in seen:
+                seen.add(i)
+                chosen.append(i)
+                if len(chosen) == count:
+                    return chosen
+    # Efraimidis-Spirakis：每行一个 u^(1/w) 键，取最大的 count 个
+    weights = [b - a for a, b in zip([0.0] + cumulative[:-1], cumulative)]
+    keys = [rng.random() ** (1.0 / w) if w > 0 else 0.0 for w in weights]
+    return sorted(range(total), key=keys.__getitem__, reverse=True)[:count]
+
+
 class ReadTextLineByIndex:
     """
-    一个 ComfyUI 节点，用于按指定索引从 TXT 文件中读取一行文本。
+    一个 ComfyUI 节点，用于按指定索引从 TXT 文件中读取一行文本，
+    也可以按行号列表读取多行，或按种子（可加权）随机抽取若干行。
     """
     
     @classmethod
-    def IS_CHANGED(s, folder_path, file_name, line_index):
+    def IS_CHANGED(s, folder_path, file_name, line_index, **kwargs):
+        # 未固定种子的随机抽取每次都重新执行
+        if kwargs.get("sample_count", 0) > 0 and kwargs.get("seed", -1) < 0:
+            return float("nan")
         # 如果文件路径、文件名或索引改变，强制重新执行
         # 此外，如果文件本身被修改，也应该重新执行
         safe_file_name = "".join(c for c in file_name if c.isalnum() or c in (' ', '.', '_', '-')).strip()
@@ -65,6 +234,16 @@ class ReadTextLineByIndex:
                 "folder_path": ("STRING", {"default": FOLDER_PATH_DEFAULT_WILDCARDS}),
                 "file_name": ("STRING", {"default": FILE_NAME_DEFAULT}),
                 "line_index": ("INT", {"default": 0, "min": 0}),
+            },
+            "optional": {
+                # 非空时代替 line_index，一次读取多行，例如 "0-9,15,20-25"；范围超出文件末尾时截取到最后一行，"30-" 表示到最后一行
+                "line_spec": ("STRING", {"default": ""}),
+                # 大于 0 时忽略行号，从整个文件中不放回地随机抽取这么多行
+                "sample_count": ("INT", {"default": 0, "min": 0, "max": 10000}),
+                "seed": ("INT", {"default": -1, "min": -1, "max": 0xffffffffffffffff}),
+                # 按行首的 "权重::" 前缀加权抽取，并从输出中去掉该前缀
+                "weighted": ("BOOLEAN", {"default": False}),
+                "separator": ("STRING", {"default": ", "}),
             }
         }
 
@@ -76,7 +255,7 @@ class ReadTextLineByIndex:
     FUNCTION = "read_line" # 节点执行的函数名
     CATEGORY = CATEGORY_TEXT # 节点在ComfyUI UI中的分类
 
-    def read_line(self, folder_path, file_name, line_index):
+    def read_line(self, folder_path, file_name, line_index, line_spec="", sample_count=0, seed=-1, weighted=False, separator=", "):
         line_content = ""
         status_message = ""
         total_lines = 0
@@ -92,17 +271,30 @@ class ReadTextLineByIndex:
             return (line_content, status_message, total_lines)
 
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f.readlines()] 
-                total_lines = len(lines)
-
-                if total_lines == 0:
-                    status_message = MSG_FILE_EMPTY
-                elif line_index < 0 or line_index >= total_lines:
-                    status_message = MSG_INDEX_OUT_OF_RANGE.format(total_lines=total_lines, max_index=total_lines-1, line_index=line_index)
+            # 使用缓存的行偏移索引，只读取需要的行
+            line_offsets = _get_line_index(full_path)
+            total_lines = len(line_offsets)
+
+            if total_lines == 0:
+                status_message = MSG_FILE_EMPTY
+            elif sample_count > 0:
+                effective_seed = seed if seed >= 0 else random.randrange(2 ** 32)
+                indices = _sample_indices(line_offsets, sample_count, random.Random(effective_seed), weighted)
+                line_content = self._join_lines(line_offsets.read_lines(indices), weighted, separator)
+                mode = MSG_SAMPLE_MODE_WEIGHTED if weighted else MSG_SAMPLE_MODE_UNIFORM
+                status_message = MSG_SUCCESS_SAMPLE.format(count=len(indices), seed=effective_seed, mode=mode)
+            elif line_spec.strip():
+                indices, error_message = _parse_line_spec(line_spec, total_lines)
+                if error_message:
+                    status_message = error_message
                 else:
-                    line_content = lines[line_index]
-                    status_message = MSG_SUCCESS_READ.format(line_index=line_index)
+                    line_content = self._join_lines(line_offsets.read_lines(indices), weighted, separator)
+                    status_message = MSG_SUCCESS_READ_MULTI.format(count=len(indices))
+            elif line_index < 0 or line_index >= total_lines:
+                status_message = MSG_INDEX_OUT_OF_RANGE.format(total_lines=total_lines, max_index=total_lines-1, line_index=line_index)
+            else:
+                line_content = self._join_lines(line_offsets.read_lines([line_index]), weighted, separator)
+                status_message = MSG_SUCCESS_READ.format(line_index=line_index)
 
         except Exception as e:
             status_message = MSG_ERROR_READ_FILE.format(error=e)
@@ -111,6 +303,11 @@ class ReadTextLineByIndex:
         # 返回读取到的行内容、操作状态和文件总行数
         return (line_content, status_message, total_lines)
 
+    def _join_lines(self, lines, weighted, separator):
+        if weighted:
+            lines = [_WEIGHT_PREFIX_TEXT_RE.sub('', line, count=1) for line in lines]
+        return separator.join(lines)
+
 # 映射节点名称到类
 NODE_CLASS_MAPPINGS = {
     "ReadTextLineByIndex": ReadTextLineByIndex
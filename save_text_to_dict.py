@@ -2,6 +2,8 @@ import os
 import re
 import sys
 import time
+import atexit
+import threading
 import locale as sys_locale # 使用别名，避免与 ComfyUI 内部可能的 'locale' 模块冲突
 
 # --- 语言字符串设置 ---
@@ -15,6 +17,8 @@ RETURN_STATUS_MESSAGE_NAME = "Operation Status"
 MSG_EMPTY_INPUT = "Input text is empty or became empty after processing, nothing written."
 MSG_SUCCESS_WRITE = "Successfully written '{processed_text}' to '{full_path}'"
 MSG_ALREADY_EXISTS = "'{processed_text}' already exists in dictionary, not rewritten."
+MSG_TAG_SET_EXISTS = "A line with the same tags as '{processed_text}' already exists in dictionary, not rewritten."
+MSG_SUCCESS_BUFFERED = "Buffered '{processed_text}' for '{full_path}' ({pending} pending, {flushed} flushed)."
 MSG_ERROR_WRITE_FILE = "Error writing file: {error}"
 MSG_CONSOLE_ERROR_SAVE = "Error saving text: {error}" # 内部控制台消息，保持英文或一致
 
@@ -31,6 +35,8 @@ if current_lang and current_lang.startswith("zh"):
     MSG_EMPTY_INPUT = "输入文本为空或处理后为空，未写入任何内容。"
     MSG_SUCCESS_WRITE = "成功将 '{processed_text}' 写入到 '{full_path}'"
     MSG_ALREADY_EXISTS = "'{processed_text}' 已存在于词典中，未重复写入。"
+    MSG_TAG_SET_EXISTS = "词典中已有与 '{processed_text}' 标签相同的行，未重复写入。"
+    MSG_SUCCESS_BUFFERED = "已缓冲 '{processed_text}'，稍后写入 '{full_path}'（待写入 {pending} 行，已写入 {flushed} 行）。"
     MSG_ERROR_WRITE_FILE = "写入文件时发生错误: {error}"
     MSG_CONSOLE_ERROR_SAVE = "Error saving text: {error}" # 保持英文或根据需求汉化
 
@@ -44,6 +50,238 @@ try:
 except ImportError:
     _comfy_available = False
 
+# --- 词典内存存储 ---
+# 每个词典文件只在首次使用或被外部修改（mtime/size 变化）时完整读取一次，之后的查重都在内存集合中完成；
+# 本节点自己追加的行同步更新集合和记录的 mtime/size，因此连续写入不会触发重新读取。
+#
+# 开启缓冲写入时，新行先放在内存中，达到 flush_every 行、最后一次写入后空闲 _FLUSH_INTERVAL_SECONDS 秒
+# （通常意味着本次队列已执行完）或进程退出时批量追加。每批追加前先把 "原文件长度 + 本批内容" 写入
+# .journal 文件并落盘：进程在追加中途崩溃时，下次加载会把文件截断回原长度并重放这一批，不会留下半行。
+
+_FLUSH_INTERVAL_SECONDS = 2.0
+
+DEDUP_MODE_LINE = "exact line"
+DEDUP_MODE_TAG_SET = "tag set"
+
+# 标签归一化：去掉未转义的括号和 ":1.2" 形式的权重，小写，下划线视为空格
+_TAG_BRACKETS_RE = re.compile(r'(?<!\\)[()\[\]{}]')
+_TAG_WEIGHT_RE = re.compile(r':\s*-?\d+(?:\.\d+)?\s*$')
+_TAG_SPACES_RE = re.compile(r'\s+')
+
+def _normalize_tag(tag):
+    tag = _TAG_BRACKETS_RE.sub('', tag)
+    tag = _TAG_WEIGHT_RE.sub('', tag)
+    return _TAG_SPACES_RE.sub(' ', tag.replace('_', ' ')).strip().lower()
+
+class _TagIndex:
+    """
+    词典中所有行的标签索引：标签 -> 整数 id、每个 id 出现的行数，以及每行标签 id 集合的指纹。
+    "a, b"、"b, a" 和 "(A:1.1), b" 的指纹相同，查重只需 O(标签数)。
+    """
+
+    def __init__(self, lines=()):
+        self.tag_ids = {}
+        self.tag_counts = []
+        self.fingerprints = set()
+        for line in lines:
+            self.add(line)
+
+    def fingerprint(self, line):
+        """未登记过的标签返回 None（说明这一行一定不重复）。"""
+        ids = []
+        for tag in line.split(','):
+            tag = _normalize_tag(tag)
+            if tag:
+                tag_id = self.tag_ids.get(tag)
+                if tag_id is None:
+                    return None
+                ids.append(tag_id)
+        return frozenset(ids)
+
+    def contains(self, line):
+        fingerprint = self.fingerprint(line)
+        return fingerprint is not None and fingerprint in self.fingerprints
+
+    def add(self, line):
+        ids = set()
+        for tag in line.split(','):
+            tag = _normalize_tag(tag)
+            if tag:
+                tag_id = self.tag_ids.setdefault(tag, len(self.tag_ids))
+                if tag_id == len(self.tag_counts):
+                    self.tag_counts.append(0)
+                ids.add(tag_id)
+        fingerprint = frozenset(ids)
+        if fingerprint not in self.fingerprints:
+            self.fingerprints.add(fingerprint)
+            for tag_id in ids:
+                self.tag_counts[tag_id] += 1
+
+    def frequencies(self):
+        """{归一化标签: 包含该标签的（去重后）行数}，可作为加权抽样的权重。"""
+        return {tag: self.tag_counts[tag_id] for tag, tag_id in self.tag_ids.items()}
+
+class _DictionaryStore:
+    """一个词典文件中已有行（已去除首尾空白）的集合。"""
+
+    def __init__(self, full_path):
+        self.full_path = full_path
+        self.journal_path = full_path + '.journal'
+        self.lines = set()
+        self.mtime_ns = None
+        self.size = None
+        self.pending = []
+        self.flushed = 0
+        self.lock = threading.Lock()
+        self._timer = None
+        self._tag_index = None # 首次使用标签查重时才建立
+
+    def _recover_journal(self):
+        """上一批追加未完成时（.journal 仍存在）截断到追加前的长度并重放；日志本身不完整说明原文件尚未改动。"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                header = f.readline()
+                batch = f.read()
+        except FileNotFoundError:
+            return
+        try:
+            offset, length = (int(x) for x in header.split())
+        except ValueError:
+            offset, length = None, None
+        if length == len(batch) and os.path.exists(self.full_path):
+            with open(self.full_path, 'r+b') as f:
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(batch)
+                f.flush()
+                os.fsync(f.fileno())
+        os.remove(self.journal_path)
+
+    def _load_if_stale(self):
+        if self.mtime_ns is None:
+            self._recover_journal()
+        try:
+            stat = os.stat(self.full_path)
+        except FileNotFoundError:
+            # 文件被删除或轮换：只保留尚未写入的缓冲行，标签索引也要随之重建
+            self.lines = set(self.pending)
+            self.mtime_ns = self.size = None
+            self._tag_index = None
+            return
+        if stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size:
+            return
+        with open(self.full_path, 'r', encoding='utf-8') as f:
+            # 读取时也strip，确保比较的一致性
+            self.lines = {line.strip() for line in f}
+        # 尚未写入文件的缓冲行也参与查重
+        self.lines.update(self.pending)
+        self.mtime_ns, self.size = stat.st_mtime_ns, stat.st_size
+        self._tag_index = None
+
+    def tag_index(self):
+        with self.lock:
+            self._load_if_stale()
+            return self._tag_index_locked()
+
+    def _tag_index_locked(self):
+        if self._tag_index is None:
+            self._tag_index = _TagIndex(self.lines)
+        return self._tag_index
+
+    def add(self, text, buffered=False, flush_every=64, dedup_mode=DEDUP_MODE_LINE):
+        """文本已存在（标签模式下为标签集合已存在）时返回 False；否则追加（或缓冲）到文件末尾并返回 True。"""
+        with self.lock:
+            self._load_if_stale()
+            if text in self.lines:
+                return False
+            if dedup_mode == DEDUP_MODE_TAG_SET and self._tag_index_locked().contains(text):
+                return False
+            self.lines.add(text)
+            if self._tag_index is not None:
+                self._tag_index.add(text)
+            self.pending.append(text)
+            if not buffered or len(self.pending) >= flush_every:
+                try:
+                    self._flush_locked()
+                except Exception:
+                    # 写入失败时撤销本行，否则下次相同的输入会被误报为“已存在”；更早的缓冲行留待下次写入
+                    self.pending.remove(text)
+                    self.lines.discard(text)
+                    self._tag_index = None
+                    raise
+            else:
+                self._schedule_flush()
+            return True
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _schedule_flush(self):
+        # 每次写入都重新计时，空闲一段时间后再统一写入
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(_FLUSH_INTERVAL_SECONDS, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(MSG_CONSOLE_ERROR_SAVE.format(error=e))
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return
+        batch = ''.join(line + '\n' for line in self.pending).encode('utf-8')
+        journaled = len(self.pending) > 1
+        with open(self.full_path, 'ab') as f:
+            if journaled:
+                # 单行追加不需要日志；多行批量写入先记录追加前的长度和本批内容
+                with open(self.journal_path, 'wb') as journal:
+                    journal.write(f"{f.tell()} {len(batch)}\n".encode('ascii') + batch)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+            f.write(batch)
+            f.flush()
+            if journaled:
+                os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        if journaled:
+            os.remove(self.journal_path)
+        self.flushed += len(self.pending)
+        self.pending.clear()
+        self.mtime_ns, self.size = stat.st_mtime_ns, stat.st_size
+
+_dictionary_stores = {}
+_dictionary_stores_lock = threading.Lock()
+
+def _get_dictionary_store(full_path):
+    key = os.path.normcase(os.path.abspath(full_path))
+    with _dictionary_stores_lock:
+        store = _dictionary_stores.get(key)
+        if store is None:
+            store = _dictionary_stores[key] = _DictionaryStore(full_path)
+        return store
+
+def get_tag_frequencies(full_path):
+    """返回词典文件中各归一化标签出现的行数，供按标签频率加权抽样使用。"""
+    return _get_dictionary_store(full_path).tag_index().frequencies()
+
+@atexit.register
+def _flush_all_dictionary_stores():
+    with _dictionary_stores_lock:
+        stores = list(_dictionary_stores.values())
+    for store in stores:
+        try:
+            store.flush()
+        except Exception as e:
+            print(MSG_CONSOLE_ERROR_SAVE.format(error=e))
+
 class SaveTextToDictionaryAuto:
     """
     一个 ComfyUI 节点，用于将处理后的文本保存到指定的 TXT 词典文件。
@@ -51,7 +289,7 @@ class SaveTextToDictionaryAuto:
     """
     
     @classmethod
-    def IS_CHANGED(s, text_to_save, folder_path, file_name):
+    def IS_CHANGED(s, text_to_save, folder_path, file_name, **kwargs):
         # 强制节点每次运行时都重新计算，以确保文件操作执行
         return ""
 
@@ -64,6 +302,13 @@ class SaveTextToDictionaryAuto:
                 "folder_path": ("STRING", {"default": os.path.join(os.getcwd(), "output", "wildcards")}),
                 "file_name": ("STRING", {"default": "my_dictionary"}),
             },
+            "optional": {
+                # 批量写入：新行先缓冲在内存中，攒够 flush_every 行、空闲几秒或进程退出时再一次性追加到文件
+                "buffered_write": ("BOOLEAN", {"default": False}),
+                "flush_every": ("INT", {"default": 64, "min": 1, "max": 100000}),
+                # tag set：忽略标签顺序、权重、括号、大小写和下划线，标签集合相同的行视为重复
+                "dedup_mode": ([DEDUP_MODE_LINE, DEDUP_MODE_TAG_SET], {"default": DEDUP_MODE_LINE}),
+            },
         }
 
     # 返回类型，这里输出处理后的文本和操作消息（可选）
@@ -75,7 +320,7 @@ class SaveTextToDictionaryAuto:
     CATEGORY = CATEGORY_TEXT # 节点在ComfyUI UI中的分类
     OUTPUT_NODE = False
 
-    def save_text(self, text_to_save, folder_path, file_name):
+    def save_text(self, text_to_save, folder_path, file_name, buffered_write=False, flush_every=64, dedup_mode=DEDUP_MODE_LINE):
         """
         核心功能：处理文本并保存到文件。
         """
@@ -113,22 +358,17 @@ class SaveTextToDictionaryAuto:
             # 确保目录存在，如果不存在则创建
             os.makedirs(folder_path, exist_ok=True)
 
-            # 读取现有行进行去重，使用集合提高查找效率
-            existing_lines = set()
-            if os.path.exists(full_path):
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        # 读取时也strip，确保比较的一致性
-                        existing_lines.add(line.strip())
-
-            # 检查是否重复
-            if processed_text in existing_lines:
+            # 在内存中的词典集合里查重并追加，只有文件被外部修改时才会重新读取
+            store = _get_dictionary_store(full_path)
+            if not store.add(processed_text, buffered_write, flush_every, dedup_mode):
                 # 使用语言变量，并格式化
-                status_message = MSG_ALREADY_EXISTS.format(processed_text=processed_text)
+                if processed_text in store.lines:
+                    status_message = MSG_ALREADY_EXISTS.format(processed_text=processed_text)
+                else:
+                    status_message = MSG_TAG_SET_EXISTS.format(processed_text=processed_text)
+            elif store.pending:
+                status_message = MSG_SUCCESS_BUFFERED.format(processed_text=processed_text, full_path=full_path, pending=len(store.pending), flushed=store.flushed)
             else:
-                # 以追加模式打开文件并写入新行
-                with open(full_path, 'a', encoding='utf-8') as f:
-                    f.write(processed_text + '\n')
                 # 使用语言变量，并格式化
                 status_message = MSG_SUCCESS_WRITE.format(processed_text=processed_text, full_path=full_path)
 
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from save_text_to_dict import DEDUP_MODE_TAG_SET, SaveTextToDictionaryAuto, _DictionaryStore, _get_dictionary_store
+
+
+def test_tag_set_dedup_after_dictionary_file_is_deleted(tmp_path):
+    node = SaveTextToDictionaryAuto()
+    full_path = tmp_path / "tags.txt"
+
+    node.save_text("a, b", str(tmp_path), "tags", dedup_mode=DEDUP_MODE_TAG_SET)
+    assert full_path.read_text(encoding="utf-8").splitlines() == ["a,b"]
+
+    # 删除（或轮换）词典文件后，旧的标签集合不应再被当作重复
+    os.remove(full_path)
+    node.save_text("b, a", str(tmp_path), "tags", dedup_mode=DEDUP_MODE_TAG_SET)
+    assert full_path.read_text(encoding="utf-8").splitlines() == ["b,a"]
+
+
+def test_failed_write_is_not_reported_as_existing(tmp_path, monkeypatch):
+    node = SaveTextToDictionaryAuto()
+    full_path = tmp_path / "lines.txt"
+    node.save_text("a", str(tmp_path), "lines")
+
+    def fail(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(_DictionaryStore, "_flush_locked", fail)
+    store = _get_dictionary_store(str(full_path))
+    with pytest.raises(OSError):
+        store.add("b")
+    monkeypatch.undo()
+
+    # 写入失败的行不应留在内存集合中
+    assert store.add("b")
+    assert full_path.read_text(encoding="utf-8").splitlines() == ["a", "b"]